@@ -1,9 +1,9 @@
 from django.contrib import admin
-from .models import ChatRoom, Message, MessageRead
+from .models import ChatRoom, Message, MessageRead, ChatReadState, ChatAttachment, ChatUpload, MessageArchiveSegment
 
 @admin.register(ChatRoom)
 class ChatRoomAdmin(admin.ModelAdmin):
-    list_display = ('id', 'client', 'dietitian', 'created_at')
+    list_display = ('id', 'client', 'dietitian', 'last_message', 'created_at')
 
 @admin.register(Message)
 class MessageAdmin(admin.ModelAdmin):
@@ -12,3 +12,19 @@ class MessageAdmin(admin.ModelAdmin):
 @admin.register(MessageRead)
 class MessageReadAdmin(admin.ModelAdmin):
     list_display = ('id', 'message', 'user', 'read_at')
+
+@admin.register(ChatReadState)
+class ChatReadStateAdmin(admin.ModelAdmin):
+    list_display = ('id', 'chat_room', 'user', 'last_read_message', 'unread_count', 'updated_at')
+
+@admin.register(ChatAttachment)
+class ChatAttachmentAdmin(admin.ModelAdmin):
+    list_display = ('id', 'file', 'content_type', 'size', 'sha256', 'created_at')
+
+@admin.register(ChatUpload)
+class ChatUploadAdmin(admin.ModelAdmin):
+    list_display = ('id', 'chat_room', 'user', 'filename', 'received', 'size', 'attachment', 'created_at')
+
+@admin.register(MessageArchiveSegment)
+class MessageArchiveSegmentAdmin(admin.ModelAdmin):
+    list_display = ('id', 'chat_room', 'first_message_id', 'last_message_id', 'message_count', 'last_created_at')
@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import sys
+from channels.db import database_sync_to_async
+from django.conf import settings
+from .services import MessageService
+
+logger = logging.getLogger(__name__)
+
+
+class MessageWriteBuffer:
+    def __init__(self, batch_size, flush_interval, max_pending, drain_timeout):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.drain_timeout = drain_timeout
+        self.loop = None
+        self.queue = None
+        self.flusher = None
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            pending = []
+            while self.queue is not None and not self.queue.empty():
+                pending.append(self.queue.get_nowait())
+            self.loop = loop
+            self.queue = asyncio.Queue(maxsize=self.max_pending)
+            for item in pending:
+                self.queue.put_nowait(item)
+            self.flusher = None
+            self.install_shutdown_hook()
+        if self.flusher is None or self.flusher.done():
+            self.flusher = loop.create_task(self.run())
+
+    def install_shutdown_hook(self):
+        if 'twisted.internet.reactor' not in sys.modules:
+            return
+
+        from twisted.internet import defer, reactor
+        reactor.addSystemEventTrigger(
+            'before',
+            'shutdown',
+            lambda: defer.Deferred.fromFuture(asyncio.ensure_future(self.drain()))
+        )
+
+    async def put(self, message):
+        self.start()
+        written = self.loop.create_future()
+        await self.queue.put((message, written))
+        return written
+
+    async def drain(self):
+        if self.queue is None or self.loop is not asyncio.get_running_loop():
+            return
+        self.start()
+        try:
+            await asyncio.wait_for(self.queue.join(), self.drain_timeout)
+        except asyncio.TimeoutError:
+            logger.error("Timed out draining %s buffered chat messages.", self.queue.qsize())
+
+    async def next_batch(self):
+        batch = [await self.queue.get()]
+        deadline = self.loop.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            timeout = deadline - self.loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def run(self):
+        while True:
+            batch = await self.next_batch()
+            try:
+                await self.write([message for message, _ in batch])
+            except Exception:
+                logger.exception("Unexpected failure writing %s buffered chat messages.", len(batch))
+            finally:
+                for _, written in batch:
+                    if not written.done():
+                        written.set_result(None)
+                    self.queue.task_done()
+
+    async def write(self, batch):
+        try:
+            await database_sync_to_async(MessageService.create_messages)(batch)
+            return
+        except Exception:
+            logger.exception("Batched write of %s chat messages failed, retrying one by one.", len(batch))
+
+        for message in batch:
+            try:
+                await database_sync_to_async(MessageService.create_message)(
+                    chat_room=message.chat_room,
+                    sender=message.sender,
+                    content=message.content,
+                    client_message_id=message.client_message_id
+                )
+            except Exception:
+                logger.exception(
+                    "Writing chat message from user %s in room %s failed, handing it to the retry queue.",
+                    message.sender_id,
+                    message.chat_room_id
+                )
+                await database_sync_to_async(self.dead_letter)(message)
+
+    def dead_letter(self, message):
+        from .tasks import save_chat_message
+        try:
+            save_chat_message.delay(
+                message.chat_room_id,
+                message.sender_id,
+                message.content,
+                str(message.client_message_id) if message.client_message_id else None
+            )
+        except Exception:
+            logger.exception(
+                "Dropping chat message %s from user %s in room %s.",
+                message.client_message_id,
+                message.sender_id,
+                message.chat_room_id
+            )
+
+
+message_buffer = MessageWriteBuffer(
+    batch_size=settings.CHAT_WRITE_BEHIND_BATCH_SIZE,
+    flush_interval=settings.CHAT_WRITE_BEHIND_FLUSH_INTERVAL,
+    max_pending=settings.CHAT_WRITE_BEHIND_MAX_PENDING,
+    drain_timeout=settings.CHAT_WRITE_BEHIND_DRAIN_TIMEOUT,
+)
@@ -1,94 +1,304 @@
+import asyncio
 import json
+import time
+import uuid
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from django.contrib.auth import get_user_model
-from .models import ChatRoom, Message, MessageRead
+from django.conf import settings
+from .buffer import message_buffer
+from .models import ChatRoom, Message
+from .services import MessageService
+from users.services import PresenceService
+
+
+def connected_frame():
+    return {
+        "type": "connected",
+        "heartbeat_interval": settings.PRESENCE_HEARTBEAT_INTERVAL,
+        "presence_ttl": settings.PRESENCE_TTL
+    }
+
+
+def parse_frame(text_data):
+    try:
+        data = json.loads(text_data or "")
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def parse_message_id(value):
+    if isinstance(value, bool):
+        return None
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
+
+def parse_client_message_id(value):
+    if value is None:
+        return None
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
 
-User = get_user_model()
 
 class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.room_id = self.scope["url_route"]["kwargs"]["room_id"]
-        self.room_group_name = f"chat_{self.room_id}"
-        
-        setattr(self, "room_group_name", self.room_group_name)
+        user = self.scope.get("user")
+        if not user or user.is_anonymous:
+            await self.close(code=4401)
+            return
 
+        self.room = await self.get_room()
+        if self.room is None or user.id not in self.participant_ids:
+            await self.close(code=4403)
+            return
+
+        self.room_group_name = f"chat_{self.room_id}"
+        self.typing_sent_at = 0
+        self.is_typing = False
+        self.last_delivered_id = 0
+        self.pending_writes = set()
         await self.channel_layer.group_add(
             self.room_group_name,
             self.channel_name
         )
 
         await self.accept()
-
-        user = self.scope.get("user")
-        if not user or user.is_anonymous:
-            self.scope["user"] = await self.get_first_user()
+        await self.update_user_status(is_online=True)
+        await self.send(text_data=json.dumps(connected_frame()))
 
     async def disconnect(self, close_code):
+        pending_writes = getattr(self, "pending_writes", None)
+        if pending_writes:
+            await asyncio.wait(set(pending_writes), timeout=settings.CHAT_WRITE_BEHIND_DRAIN_TIMEOUT)
+
+        if getattr(self, "room_group_name", None):
+            await self.update_user_status(is_online=False)
+
         room_group_name = getattr(self, "room_group_name", None)
         if room_group_name:
             await self.channel_layer.group_discard(room_group_name, self.channel_name)
 
-    async def receive(self, text_data):
-        data = json.loads(text_data)
+    async def receive(self, text_data=None, bytes_data=None):
+        data = parse_frame(text_data)
+        if data is None:
+            await self.send_error("Frames must be JSON objects.")
+            return
+
         user = self.scope.get("user")
 
-        if data.get("type") == "chat_message":
-            message = data["message"]
-            message_obj = await self.save_message(user, message)
+        if data.get("type") == "heartbeat":
+            await database_sync_to_async(PresenceService.heartbeat)(user.id)
+
+        elif data.get("type") == "typing":
+            is_typing = bool(data.get("is_typing", True))
+            now = time.monotonic()
+            if is_typing == self.is_typing and now - self.typing_sent_at < settings.CHAT_TYPING_THROTTLE:
+                return
+
+            self.is_typing = is_typing
+            self.typing_sent_at = now
+            await self.channel_layer.group_send(
+                self.room_group_name,
+                {
+                    "type": "typing",
+                    "user_id": user.id,
+                    "is_typing": is_typing,
+                    "sender_channel_name": self.channel_name
+                }
+            )
 
-            message_data = await self.get_message_data(message_obj)
+        elif data.get("type") == "delivered":
+            message_id = parse_message_id(data.get("message_id"))
+            if message_id is None:
+                await self.send_error("A valid message_id is required.")
+                return
+            if message_id <= self.last_delivered_id:
+                return
 
+            self.last_delivered_id = message_id
             await self.channel_layer.group_send(
                 self.room_group_name,
                 {
-                    "type": "chat_message",
-                    "message_data": message_data
+                    "type": "delivery_ack",
+                    "user_id": user.id,
+                    "message_id": message_id,
+                    "sender_channel_name": self.channel_name
                 }
             )
 
+        elif data.get("type") == "read":
+            message_id = None
+            if data.get("message_id") is not None:
+                message_id = parse_message_id(data["message_id"])
+                if message_id is None or not await self.message_exists(message_id):
+                    await self.send_error("A valid message_id is required.")
+                    return
+            await self.mark_room_read(user, message_id)
+
+        elif data.get("type") == "chat_message":
+            content = data.get("message")
+            if not isinstance(content, str) or not content.strip():
+                await self.send_error("Chat messages must have non-empty text.")
+                return
+            client_message_id = parse_client_message_id(data.get("client_message_id"))
+            if data.get("client_message_id") is not None and client_message_id is None:
+                await self.send_error("client_message_id must be a UUID.")
+                return
+
+            if settings.CHAT_WRITE_BEHIND:
+                written = await message_buffer.put(Message(
+                    chat_room=self.room,
+                    sender=user,
+                    content=content,
+                    client_message_id=client_message_id
+                ))
+                self.pending_writes.add(written)
+                written.add_done_callback(self.pending_writes.discard)
+            else:
+                await self.save_message(user, content, client_message_id)
+
+        else:
+            await self.send_error("Unknown frame type.")
+
+    async def send_error(self, detail):
+        await self.send(text_data=json.dumps({
+            "type": "error",
+            "detail": detail
+        }))
+
     async def chat_message(self, event):
+        self.room.last_message_id = max(self.room.last_message_id or 0, event["message_data"]["id"])
         await self.send(text_data=json.dumps({
             "type": "chat_message",
             "message_data": event["message_data"]
         }))
 
+    async def typing(self, event):
+        if event["sender_channel_name"] == self.channel_name:
+            return
+        await self.send(text_data=json.dumps({
+            "type": "typing",
+            "user_id": event["user_id"],
+            "is_typing": event["is_typing"]
+        }))
+
+    async def delivery_ack(self, event):
+        if event["sender_channel_name"] == self.channel_name:
+            return
+        await self.send(text_data=json.dumps({
+            "type": "delivery_ack",
+            "user_id": event["user_id"],
+            "message_id": event["message_id"]
+        }))
+
+    async def attachment_ready(self, event):
+        await self.send(text_data=json.dumps({
+            "type": "attachment_ready",
+            "attachment": event["attachment"]
+        }))
+
+    async def read_receipt(self, event):
+        await self.send(text_data=json.dumps({
+            "type": "read_receipt",
+            "user_id": event["user_id"],
+            "last_read_message_id": event["last_read_message_id"]
+        }))
+
     @database_sync_to_async
-    def get_first_user(self):
-        return User.objects.first()
+    def get_room(self):
+        room = ChatRoom.objects.select_related('client', 'dietitian').filter(id=self.room_id).first()
+        if room is not None:
+            self.participant_ids = room.participant_ids
+        return room
 
     @database_sync_to_async
-    def save_message(self, sender, content):
-        room = ChatRoom.objects.get(id=self.room_id)
-        return Message.objects.create(chat_room=room, sender=sender, content=content)
+    def save_message(self, sender, content, client_message_id=None):
+        return MessageService.create_message(
+            chat_room=self.room,
+            sender=sender,
+            content=content,
+            client_message_id=client_message_id
+        )
 
     @database_sync_to_async
-    def get_message_data(self, message):
-        return {
-            "id": message.id,
-            "sender": {
-                "id": message.sender.id,
-                "first_name": message.sender.first_name,
-                "last_name": message.sender.last_name
-            },
-            "content": message.content,
-            "created_at": message.created_at.isoformat(),
-            "image": message.image.url if message.image else None,
-            "file": message.file.url if message.file else None
-        }
+    def message_exists(self, message_id):
+        return Message.objects.filter(chat_room=self.room, id=message_id).exists()
+
+    @database_sync_to_async
+    def mark_room_read(self, user, message_id=None):
+        return MessageService.mark_read(self.room, user, message_id)
 
     @database_sync_to_async
     def mark_message_as_read(self, message, user):
-        MessageRead.objects.get_or_create(message=message, user=user)
+        MessageService.mark_read(message.chat_room, user, message.id)
 
     @database_sync_to_async
     def mark_message_as_read_by_id(self, message_id, user):
-        message = Message.objects.get(id=message_id)
-        MessageRead.objects.get_or_create(message=message, user=user)
+        message = Message.objects.select_related('chat_room').get(id=message_id)
+        MessageService.mark_read(message.chat_room, user, message.id)
 
     @database_sync_to_async
     def update_user_status(self, is_online):
         user = self.scope.get("user")
-        if user and not user.is_anonymous:
-            user.is_online = is_online
-            user.save()
\ No newline at end of file
+        if is_online:
+            PresenceService.connect(user.id)
+        else:
+            PresenceService.disconnect(user.id)
+
+
+class InboxConsumer(AsyncWebsocketConsumer):
+    async def connect(self):
+        user = self.scope.get("user")
+        if not user or user.is_anonymous:
+            await self.close(code=4401)
+            return
+
+        self.user_id = user.id
+        self.inbox_group_name = f"inbox_{self.user_id}"
+        await self.channel_layer.group_add(self.inbox_group_name, self.channel_name)
+        await self.accept()
+        await database_sync_to_async(PresenceService.connect)(self.user_id)
+        await self.send(text_data=json.dumps(connected_frame()))
+
+    async def disconnect(self, close_code):
+        inbox_group_name = getattr(self, "inbox_group_name", None)
+        if inbox_group_name:
+            await database_sync_to_async(PresenceService.disconnect)(self.user_id)
+            await self.channel_layer.group_discard(inbox_group_name, self.channel_name)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        data = parse_frame(text_data)
+        if data is None or data.get("type") != "heartbeat":
+            await self.send(text_data=json.dumps({
+                "type": "error",
+                "detail": "Only heartbeat frames are accepted."
+            }))
+            return
+
+        await database_sync_to_async(PresenceService.heartbeat)(self.user_id)
+
+    async def inbox_message(self, event):
+        payload = {
+            "type": "message",
+            "room_id": event["room_id"],
+            "last_message": event["last_message"]
+        }
+        if "unread_count" in event:
+            payload["unread_count"] = event["unread_count"]
+        else:
+            payload["unread_delta"] = event["unread_delta"]
+        await self.send(text_data=json.dumps(payload))
+
+    async def inbox_read(self, event):
+        await self.send(text_data=json.dumps({
+            "type": "read",
+            "room_id": event["room_id"],
+            "unread_count": event["unread_count"]
+        }))
@@ -0,0 +1,13 @@
+from .buffer import message_buffer
+
+
+class LifespanApp:
+    async def __call__(self, scope, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await message_buffer.drain()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
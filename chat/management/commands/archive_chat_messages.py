@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from chat.services import MessageArchiveService
+
+
+class Command(BaseCommand):
+    help = "Move chat messages older than the archive age into compressed per-room archive segments."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=settings.CHAT_ARCHIVE_AFTER_DAYS)
+
+    def handle(self, *args, **options):
+        archived = MessageArchiveService.archive_messages(options['older_than_days'])
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} chat messages."))
@@ -0,0 +1,67 @@
+import asyncio
+import time
+import uuid
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from chat.buffer import MessageWriteBuffer
+from chat.models import ChatRoom, Message
+from chat.services import MessageService
+from core.enums import UserType
+from users.models import ClientProfile, DietitianProfile
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Compare chat message throughput of per-message inserts against the write-behind buffer."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=2000)
+        parser.add_argument('--senders', type=int, default=20, help="Number of concurrent sockets sending messages.")
+
+    def handle(self, *args, **options):
+        suffix = uuid.uuid4().hex[:8]
+        client_user = User.objects.create_user(f'chat-benchmark-client-{suffix}@example.com', user_type=UserType.CLIENT)
+        dietitian_user = User.objects.create_user(f'chat-benchmark-dietitian-{suffix}@example.com', user_type=UserType.DIETITIAN)
+        room = ChatRoom.objects.create(
+            client=ClientProfile.objects.create(user=client_user),
+            dietitian=DietitianProfile.objects.create(user=dietitian_user)
+        )
+
+        try:
+            for mode in ('direct', 'write-behind'):
+                seconds = async_to_sync(self.run)(mode, room, [client_user, dietitian_user], options)
+                self.stdout.write(
+                    f"{mode}: {options['messages']} messages in {seconds:.2f}s "
+                    f"({options['messages'] / seconds:.0f} messages/s)"
+                )
+        finally:
+            client_user.hard_delete()
+            dietitian_user.hard_delete()
+
+    async def run(self, mode, room, users, options):
+        buffer = MessageWriteBuffer(
+            batch_size=settings.CHAT_WRITE_BEHIND_BATCH_SIZE,
+            flush_interval=settings.CHAT_WRITE_BEHIND_FLUSH_INTERVAL,
+            max_pending=settings.CHAT_WRITE_BEHIND_MAX_PENDING,
+            drain_timeout=None,
+        )
+        per_sender = options['messages'] // options['senders']
+        create_message = database_sync_to_async(MessageService.create_message)
+
+        async def send(sender_index):
+            sender = users[sender_index % len(users)]
+            for index in range(per_sender):
+                content = f'benchmark {sender_index}-{index}'
+                if mode == 'direct':
+                    await create_message(chat_room=room, sender=sender, content=content)
+                else:
+                    await buffer.put(Message(chat_room=room, sender=sender, content=content))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(send(index) for index in range(options['senders'])))
+        await buffer.drain()
+        return time.perf_counter() - started
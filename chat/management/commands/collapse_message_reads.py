@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from chat.services import ChatRoomService
+
+
+class Command(BaseCommand):
+    help = "Fold per-message MessageRead rows into per-room read watermarks and delete them."
+
+    def handle(self, *args, **options):
+        collapsed = ChatRoomService.collapse_message_reads()
+        self.stdout.write(self.style.SUCCESS(f"Collapsed {collapsed} message read rows into read watermarks."))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from chat.services import ChatRoomService
+
+
+class Command(BaseCommand):
+    help = "Recompute last messages and per-user unread counters for every chat room."
+
+    def handle(self, *args, **options):
+        rebuilt = ChatRoomService.rebuild_read_states()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} chat read states."))
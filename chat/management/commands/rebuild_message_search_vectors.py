@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from chat.services import MessageService
+
+
+class Command(BaseCommand):
+    help = "Recompute the full-text search vector of every chat message."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        last_id = MessageService.rebuild_search_vectors(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt search vectors for messages up to id {last_id}."))
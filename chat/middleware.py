@@ -0,0 +1,43 @@
+from urllib.parse import parse_qs
+from channels.auth import AuthMiddlewareStack
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    query_param = 'token'
+
+    def get_raw_token(self, scope):
+        query = parse_qs(scope.get('query_string', b'').decode())
+        if query.get(self.query_param):
+            return query[self.query_param][0].encode()
+
+        authentication = JWTAuthentication()
+        for name, value in scope.get('headers', []):
+            if name == b'authorization':
+                try:
+                    return authentication.get_raw_token(value)
+                except AuthenticationFailed:
+                    return None
+        return None
+
+    @database_sync_to_async
+    def get_user(self, raw_token):
+        authentication = JWTAuthentication()
+        try:
+            return authentication.get_user(authentication.get_validated_token(raw_token))
+        except (InvalidToken, TokenError, AuthenticationFailed):
+            return AnonymousUser()
+
+    async def __call__(self, scope, receive, send):
+        raw_token = self.get_raw_token(scope)
+        if raw_token:
+            scope = dict(scope, user=await self.get_user(raw_token))
+        return await super().__call__(scope, receive, send)
+
+
+def JWTAuthMiddlewareStack(inner):
+    return AuthMiddlewareStack(JWTAuthMiddleware(inner))
@@ -1,5 +1,9 @@
+import uuid
 from django.db import models
 from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from core.models import BaseModel
 from users.models import ClientProfile, DietitianProfile
 
@@ -15,6 +19,13 @@ class ChatRoom(BaseModel):
         on_delete=models.CASCADE,
         related_name='dietitian_chat_rooms'
     )
+    last_message = models.ForeignKey(
+        'Message',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
 
     class Meta:
         unique_together = ('client', 'dietitian')
@@ -22,8 +33,65 @@ class ChatRoom(BaseModel):
 
     def __str__(self):
         return f'Chat between {self.client.get_full_name()} and {self.dietitian.get_full_name()}'
+
+    @property
+    def participant_ids(self):
+        return [self.client.user_id, self.dietitian.user_id]
     
 
+class ChatAttachment(models.Model):
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(upload_to='chat/attachments/')
+    content_type = models.CharField(max_length=100)
+    size = models.PositiveBigIntegerField()
+    thumbnail = models.ImageField(upload_to='chat/thumbnails/', blank=True, null=True)
+    preview = models.ImageField(upload_to='chat/previews/', blank=True, null=True)
+    width = models.PositiveIntegerField(blank=True, null=True)
+    height = models.PositiveIntegerField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.file.name} ({self.size} bytes)'
+
+    @property
+    def is_image(self):
+        return self.content_type.startswith('image/')
+
+
+class ChatUpload(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    chat_room = models.ForeignKey(
+        ChatRoom,
+        on_delete=models.CASCADE,
+        related_name='uploads'
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='chat_uploads'
+    )
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+    attachment = models.ForeignKey(
+        ChatAttachment,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='uploads'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.filename} ({self.received}/{self.size} bytes)'
+
+    @property
+    def is_complete(self):
+        return self.attachment_id is not None
+
+
 class Message(BaseModel):
     chat_room = models.ForeignKey(
         ChatRoom,
@@ -38,14 +106,61 @@ class Message(BaseModel):
     content = models.TextField(blank=True, null= True)
     image = models.ImageField(blank=True, null= True)
     file = models.FileField(blank=True, null= True)
+    attachment = models.ForeignKey(
+        ChatAttachment,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='messages'
+    )
+    client_message_id = models.UUIDField(blank=True, null=True)
+    search_vector = SearchVectorField(blank=True, null=True, editable=False)
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['chat_room', 'created_at', 'id']),
+            GinIndex(fields=['search_vector']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['sender', 'client_message_id'],
+                name='unique_sender_client_message_id'
+            ),
+        ]
 
     def __str__(self):
         return f'Message from {self.sender.get_full_name()} at {self.created_at.strftime("%Y-%m-%d %H:%M")}'
 
 
+def get_archive_storage():
+    return FileSystemStorage(location=settings.CHAT_ARCHIVE_ROOT)
+
+
+class MessageArchiveSegment(models.Model):
+    chat_room = models.ForeignKey(
+        ChatRoom,
+        on_delete=models.CASCADE,
+        related_name='archive_segments'
+    )
+    file = models.FileField(storage=get_archive_storage, upload_to='segments/')
+    first_message_id = models.BigIntegerField()
+    last_message_id = models.BigIntegerField()
+    first_created_at = models.DateTimeField()
+    last_created_at = models.DateTimeField()
+    message_count = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['first_created_at', 'first_message_id']
+        indexes = [
+            models.Index(fields=['chat_room', 'first_created_at', 'first_message_id']),
+        ]
+
+    def __str__(self):
+        return f'Room {self.chat_room_id} messages {self.first_message_id}-{self.last_message_id}'
+
+
 class MessageRead(BaseModel):
     message = models.ForeignKey(
         Message,
@@ -64,3 +179,33 @@ class MessageRead(BaseModel):
 
     def __str__(self):
         return f'Message {self.message.id} read by {self.user.get_full_name()}'
+
+
+
+class ChatReadState(models.Model):
+    chat_room = models.ForeignKey(
+        ChatRoom,
+        on_delete=models.CASCADE,
+        related_name='read_states'
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='chat_read_states'
+    )
+    last_read_message = models.ForeignKey(
+        Message,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    unread_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('chat_room', 'user')
+
+    def __str__(self):
+        return f'{self.user.get_full_name()} in room {self.chat_room_id}: {self.unread_count} unread'
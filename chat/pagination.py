@@ -0,0 +1,40 @@
+from core.pagination import BidirectionalKeysetPagination
+from .services import MessageArchiveService
+
+
+class MessageHistoryPagination(BidirectionalKeysetPagination):
+    def paginate_queryset(self, queryset, request, view=None):
+        results = super().paginate_queryset(queryset, request, view)
+        page_size = self.get_page_size(request)
+        chat_room_id = view.kwargs['chat_room_id']
+        before = request.query_params.get(self.before_query_param)
+        after = request.query_params.get(self.after_query_param)
+
+        if after:
+            archived = MessageArchiveService.get_messages(
+                chat_room_id,
+                after=self.decode_cursor(after),
+                limit=page_size + 1
+            )
+            if not archived:
+                return results
+
+            results = archived + results
+            self.has_next = self.has_next or len(results) > page_size
+            results = results[:page_size]
+        elif not self.has_previous:
+            if results:
+                cursor = self.get_keyset_values(results[0])
+            else:
+                cursor = self.decode_cursor(before) if before else None
+
+            remaining = page_size - len(results)
+            archived = MessageArchiveService.get_messages(chat_room_id, before=cursor, limit=remaining + 1)
+            if not archived:
+                return results
+
+            self.has_previous = len(archived) > remaining
+            results = archived[max(len(archived) - remaining, 0):] + results
+
+        self.set_cursors(results)
+        return results
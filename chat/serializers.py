@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import ChatRoom, Message, MessageRead
+from .models import ChatRoom, Message, MessageRead, ChatAttachment, ChatUpload
 from django.contrib.auth import get_user_model
 from users.models import ClientProfile, DietitianProfile 
 from django.conf import settings
@@ -35,42 +35,87 @@ class MessageReadSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'updated_at']
 
 
+class MarkRoomReadSerializer(serializers.Serializer):
+    message_id = serializers.IntegerField(min_value=1, required=False)
+
+    def validate_message_id(self, value):
+        if not Message.objects.filter(chat_room=self.context['chat_room'], id=value).exists():
+            raise serializers.ValidationError("This message is not in this chat room.")
+        return value
+
+
+class ChatAttachmentSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ChatAttachment
+        fields = ['id', 'content_type', 'size', 'file', 'thumbnail', 'preview', 'width', 'height']
+        read_only_fields = fields
+
+
+class ChatUploadSerializer(serializers.ModelSerializer):
+    attachment = ChatAttachmentSerializer(read_only=True)
+
+    class Meta:
+        model = ChatUpload
+        fields = ['id', 'chat_room', 'filename', 'content_type', 'size', 'received', 'attachment', 'created_at']
+        read_only_fields = ['id', 'chat_room', 'received', 'attachment', 'created_at']
+
+
 class MessageSerializer(serializers.ModelSerializer):
     sender = UserSerializer(read_only=True)
+    attachment = ChatAttachmentSerializer(read_only=True)
+    upload_id = serializers.UUIDField(write_only=True, required=False)
+
     class Meta:
         model = Message
-        fields = ['id', 'chat_room', 'sender', 'content', 'created_at', 'file', 'image']
-        read_only_fields = ['id', 'created_at']
+        fields = [
+            'id', 'client_message_id', 'chat_room', 'sender', 'content', 'created_at',
+            'file', 'image', 'attachment', 'upload_id'
+        ]
+        read_only_fields = ['id', 'chat_room', 'created_at']
+
+    def validate_upload_id(self, value):
+        chat_room_id = self.instance.chat_room_id if self.instance is not None else self.context['chat_room_id']
+        upload = ChatUpload.objects.select_related('attachment').filter(
+            id=value,
+            user=self.context['request'].user,
+            chat_room_id=chat_room_id,
+            attachment__isnull=False
+        ).first()
+        if upload is None:
+            raise serializers.ValidationError("Upload does not exist in this chat room or is not complete.")
+        return upload
+
+class MessageSearchSerializer(MessageSerializer):
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta(MessageSerializer.Meta):
+        fields = MessageSerializer.Meta.fields + ['rank']
 
 class ChatRoomSerializer(serializers.ModelSerializer):
     client = SimpleClientProfileSerializer(read_only=True)
     dietitian = SimpleDietitianProfileSerializer(read_only=True)
     last_message = serializers.SerializerMethodField()
-    unread_count = serializers.SerializerMethodField()
+    unread_count = serializers.IntegerField(read_only=True, default=0)
+    last_read_message_id = serializers.IntegerField(read_only=True, default=None)
+    peer_last_read_message_id = serializers.IntegerField(read_only=True, default=None)
 
     class Meta:
         model = ChatRoom
-        fields = ['id', 'client', 'dietitian', 'created_at', 'last_message', 'unread_count']
+        fields = [
+            'id', 'client', 'dietitian', 'created_at', 'last_message',
+            'unread_count', 'last_read_message_id', 'peer_last_read_message_id'
+        ]
         read_only_fields = ['id', 'created_at']
 
     def get_last_message(self, obj):
-        last_message = obj.messages.order_by('-created_at').first()
+        last_message = obj.last_message
         if last_message:
             return {
                 'content': last_message.content,
                 'created_at': last_message.created_at,
-                'sender_id': last_message.sender.id
+                'sender_id': last_message.sender_id
             }
         return None
-
-    def get_unread_count(self, obj):
-        user = self.context['request'].user
-        unread_count = Message.objects.filter(
-            chat_room=obj
-        ).exclude(
-            read_by__user=user
-        ).count()  
-        return unread_count
     
 class ChatRoomCreateSerializer(serializers.ModelSerializer):
     dietitian_id = serializers.IntegerField(write_only=True)
@@ -0,0 +1,669 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+import gzip
+import hashlib
+import io
+import json
+import os
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_datetime
+from django.contrib.postgres.search import SearchRank, SearchVector
+from rest_framework import exceptions
+from core.services import FullTextSearchService
+from django.db import IntegrityError, transaction
+from django.db.models import Q, F, Max, Count, Value, FloatField, FilteredRelation, OuterRef, Subquery
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+from .models import (
+    ChatRoom,
+    Message,
+    MessageRead,
+    ChatReadState,
+    ChatAttachment,
+    ChatUpload,
+    MessageArchiveSegment,
+)
+from .serializers import MessageSerializer, ChatAttachmentSerializer
+
+User = get_user_model()
+
+
+class ChatRoomService:
+    @staticmethod
+    def with_read_state(queryset, user):
+        return queryset.annotate(
+            user_read_state=FilteredRelation('read_states', condition=Q(read_states__user=user)),
+            unread_count=Coalesce(F('user_read_state__unread_count'), Value(0)),
+            last_read_message_id=F('user_read_state__last_read_message_id'),
+            peer_last_read_message_id=Subquery(
+                ChatReadState.objects.filter(
+                    chat_room=OuterRef('pk')
+                ).exclude(
+                    user=user
+                ).order_by('-last_read_message_id').values('last_read_message_id')[:1]
+            ),
+        ).select_related(
+            'client__user',
+            'dietitian__user',
+            'last_message__sender',
+        )
+
+    @staticmethod
+    def get_user_rooms(user):
+        if hasattr(user, 'client_profile'):
+            queryset = ChatRoom.objects.filter(client__user=user)
+        elif hasattr(user, 'dietitian_profile'):
+            queryset = ChatRoom.objects.filter(dietitian__user=user)
+        elif user.is_staff:
+            queryset = ChatRoom.objects.all()
+        else:
+            return ChatRoom.objects.none()
+
+        return ChatRoomService.with_read_state(queryset, user)
+
+    @staticmethod
+    def create_read_states(chat_room):
+        ChatReadState.objects.bulk_create(
+            [
+                ChatReadState(chat_room=chat_room, user_id=user_id)
+                for user_id in chat_room.participant_ids
+            ],
+            ignore_conflicts=True
+        )
+
+    @staticmethod
+    def get_participant_ids(chat_room):
+        key = f'chat_room_participants_{chat_room.id}'
+        participant_ids = cache.get(key)
+        if participant_ids is None:
+            participant_ids = list(
+                ChatRoom.objects.filter(id=chat_room.id).values_list('client__user_id', 'dietitian__user_id').first() or []
+            )
+            cache.set(key, participant_ids, None)
+        return participant_ids
+
+    @staticmethod
+    def ensure_read_states():
+        states = [
+            ChatReadState(chat_room_id=chat_room_id, user_id=user_id)
+            for chat_room_id, client_user_id, dietitian_user_id in ChatRoom.objects.values_list(
+                'id', 'client__user_id', 'dietitian__user_id'
+            ).iterator()
+            for user_id in (client_user_id, dietitian_user_id)
+        ]
+        ChatReadState.objects.bulk_create(states, batch_size=1000, ignore_conflicts=True)
+
+    @staticmethod
+    def recount_unread():
+        unread_messages = Message.objects.filter(
+            chat_room=OuterRef('chat_room')
+        ).exclude(
+            sender=OuterRef('user')
+        )
+
+        ChatReadState.objects.filter(last_read_message__isnull=True).update(
+            unread_count=MessageService.count_subquery(unread_messages)
+        )
+        ChatReadState.objects.filter(last_read_message__isnull=False).update(
+            unread_count=MessageService.count_subquery(
+                unread_messages.filter(id__gt=OuterRef('last_read_message_id'))
+            )
+        )
+
+    @staticmethod
+    @transaction.atomic
+    def rebuild_read_states():
+        latest_message = Message.objects.filter(chat_room=OuterRef('pk')).order_by('-id').values('id')[:1]
+        ChatRoom.objects.update(last_message=Subquery(latest_message))
+
+        ChatRoomService.ensure_read_states()
+        ChatRoomService.recount_unread()
+        return ChatReadState.objects.count()
+
+    @staticmethod
+    @transaction.atomic
+    def collapse_message_reads():
+        ChatRoomService.ensure_read_states()
+
+        reads = MessageRead.objects.all_with_deleted()
+        watermarks = reads.order_by().values('message__chat_room_id', 'user_id').annotate(
+            last_read_message_id=Max('message_id')
+        )
+        for watermark in watermarks.iterator():
+            ChatReadState.objects.filter(
+                chat_room_id=watermark['message__chat_room_id'],
+                user_id=watermark['user_id']
+            ).filter(
+                Q(last_read_message__isnull=True) | Q(last_read_message_id__lt=watermark['last_read_message_id'])
+            ).update(last_read_message_id=watermark['last_read_message_id'])
+
+        collapsed, _ = reads.hard_delete()
+        ChatRoomService.recount_unread()
+        return collapsed
+
+
+class MessageService:
+    @staticmethod
+    @transaction.atomic
+    def create_message(chat_room, sender, **data):
+        client_message_id = data.pop('client_message_id', None)
+        if client_message_id:
+            message, created = Message.objects.get_or_create(
+                sender=sender,
+                client_message_id=client_message_id,
+                defaults={'chat_room': chat_room, **data}
+            )
+            if not created:
+                return message
+        else:
+            message = Message.objects.create(chat_room=chat_room, sender=sender, **data)
+
+        MessageService.record_messages(chat_room, [message])
+        return message
+
+    @staticmethod
+    @transaction.atomic
+    def create_messages(messages):
+        keys = {message.client_message_id for message in messages if message.client_message_id}
+        existing = {
+            (message.sender_id, str(message.client_message_id)): message
+            for message in Message.objects.filter(client_message_id__in=keys)
+        } if keys else {}
+
+        results = []
+        new_messages = []
+        for message in messages:
+            key = (message.sender_id, str(message.client_message_id))
+            if message.client_message_id and key in existing:
+                results.append(existing[key])
+                continue
+            if message.client_message_id:
+                existing[key] = message
+            new_messages.append(message)
+            results.append(message)
+
+        try:
+            with transaction.atomic():
+                Message.objects.bulk_create(new_messages)
+        except IntegrityError:
+            return [
+                MessageService.create_message(
+                    chat_room=message.chat_room,
+                    sender=message.sender,
+                    content=message.content,
+                    client_message_id=message.client_message_id
+                )
+                for message in messages
+            ]
+
+        rooms = {}
+        for message in new_messages:
+            rooms.setdefault(message.chat_room_id, []).append(message)
+        for room_messages in rooms.values():
+            MessageService.record_messages(room_messages[0].chat_room, room_messages)
+        return results
+
+    @staticmethod
+    def record_messages(chat_room, messages):
+        last_message = messages[-1]
+        ChatRoom.objects.filter(id=chat_room.id).update(last_message=last_message, updated_at=timezone.now())
+        chat_room.last_message = last_message
+        MessageService.update_search_vectors([message.id for message in messages if message.content])
+
+        sender_ids = {message.sender_id for message in messages}
+        ChatReadState.objects.filter(chat_room=chat_room).exclude(user_id__in=sender_ids).update(
+            unread_count=F('unread_count') + len(messages)
+        )
+        sender_unread_counts = {}
+        sender_read_ids = {}
+        for sender_id in sender_ids:
+            last_sent = max(index for index, message in enumerate(messages) if message.sender_id == sender_id)
+            sender_unread_counts[sender_id] = sum(
+                1 for message in messages[last_sent + 1:] if message.sender_id != sender_id
+            )
+            sender_read_ids[sender_id] = messages[last_sent].id
+            ChatReadState.objects.filter(chat_room=chat_room, user_id=sender_id).update(
+                last_read_message=messages[last_sent],
+                unread_count=sender_unread_counts[sender_id]
+            )
+
+        messages_data = MessageSerializer(messages, many=True).data
+        inbox_events = []
+        preview = {
+            'id': last_message.id,
+            'sender_id': last_message.sender_id,
+            'content': (last_message.content or '')[:settings.CHAT_INBOX_PREVIEW_LENGTH],
+            'created_at': messages_data[-1]['created_at'],
+        }
+        for user_id in ChatRoomService.get_participant_ids(chat_room):
+            payload = {'room_id': chat_room.id, 'last_message': preview}
+            if user_id in sender_unread_counts:
+                payload['unread_count'] = sender_unread_counts[user_id]
+            else:
+                payload['unread_delta'] = len(messages)
+            inbox_events.append((user_id, payload))
+
+        pending_attachment_ids = {
+            message.attachment_id for message in messages
+            if message.attachment_id and message.attachment.is_image and not message.attachment.thumbnail
+        }
+
+        def publish():
+            MessageService.publish_messages(chat_room.id, messages_data)
+            for sender_id, last_read_message_id in sender_read_ids.items():
+                MessageService.publish_event(
+                    chat_room.id,
+                    'read_receipt',
+                    {'user_id': sender_id, 'last_read_message_id': last_read_message_id}
+                )
+            for user_id, payload in inbox_events:
+                MessageService.publish_inbox_event(user_id, 'inbox_message', payload)
+            if pending_attachment_ids:
+                ready = ChatAttachment.objects.filter(id__in=pending_attachment_ids).exclude(
+                    Q(thumbnail='') | Q(thumbnail__isnull=True)
+                )
+                for attachment in ready:
+                    MessageService.publish_event(
+                        chat_room.id,
+                        'attachment_ready',
+                        {'attachment': ChatAttachmentSerializer(attachment).data}
+                    )
+
+        transaction.on_commit(publish)
+
+    @staticmethod
+    def update_search_vectors(message_ids):
+        if message_ids:
+            Message.objects.all_with_deleted().filter(id__in=message_ids).update(
+                search_vector=SearchVector('content', config=settings.SEARCH_CONFIG)
+            )
+
+    @staticmethod
+    def rebuild_search_vectors(batch_size=10000):
+        messages = Message.objects.all_with_deleted()
+        last_id = messages.order_by('-id').values_list('id', flat=True).first() or 0
+        for start in range(0, last_id, batch_size):
+            messages.filter(id__gt=start, id__lte=start + batch_size).update(
+                search_vector=SearchVector('content', config=settings.SEARCH_CONFIG)
+            )
+        return last_id
+
+    @staticmethod
+    def search_messages(user, text):
+        search_query = FullTextSearchService.build_query(text, config=settings.SEARCH_CONFIG)
+        if search_query is None:
+            return Message.objects.none().annotate(rank=Value(0.0, output_field=FloatField()))
+
+        return Message.objects.filter(
+            chat_room_id__in=ChatReadState.objects.filter(user=user).values('chat_room_id'),
+            search_vector=search_query
+        ).annotate(
+            rank=Cast(SearchRank(F('search_vector'), search_query), FloatField())
+        ).select_related('sender', 'attachment')
+
+    @staticmethod
+    def publish_messages(chat_room_id, messages_data):
+        group_send = async_to_sync(get_channel_layer().group_send)
+        for message_data in messages_data:
+            group_send(
+                f'chat_{chat_room_id}',
+                {
+                    'type': 'chat_message',
+                    'message_data': message_data
+                }
+            )
+
+    @staticmethod
+    def publish_event(chat_room_id, event_type, payload):
+        async_to_sync(get_channel_layer().group_send)(
+            f'chat_{chat_room_id}',
+            {'type': event_type, **payload}
+        )
+
+    @staticmethod
+    def publish_inbox_event(user_id, event_type, payload):
+        async_to_sync(get_channel_layer().group_send)(
+            f'inbox_{user_id}',
+            {'type': event_type, **payload}
+        )
+
+    @staticmethod
+    def count_subquery(messages):
+        return Coalesce(
+            Subquery(messages.order_by().values('chat_room').annotate(count=Count('id')).values('count')),
+            Value(0)
+        )
+
+    @staticmethod
+    @transaction.atomic
+    def mark_read(chat_room, user, message_id=None):
+        state = ChatReadState.objects.select_for_update().filter(chat_room=chat_room, user=user).first()
+        last_message_id = ChatRoom.objects.filter(id=chat_room.id).values_list('last_message_id', flat=True).first()
+        if last_message_id is None:
+            return None
+
+        if message_id is None or message_id >= last_message_id:
+            message_id = last_message_id
+            unread_count = 0
+        else:
+            unread_count = Message.objects.filter(
+                chat_room=chat_room,
+                id__gt=message_id
+            ).exclude(sender=user).count()
+
+        if state is None:
+            ChatReadState.objects.bulk_create(
+                [
+                    ChatReadState(
+                        chat_room=chat_room,
+                        user=user,
+                        last_read_message_id=message_id,
+                        unread_count=unread_count
+                    )
+                ],
+                ignore_conflicts=True
+            )
+            return message_id
+
+        if state.last_read_message_id is not None and state.last_read_message_id >= message_id:
+            return message_id
+
+        state.last_read_message_id = message_id
+        state.unread_count = unread_count
+        state.save(update_fields=['last_read_message', 'unread_count', 'updated_at'])
+
+        def publish():
+            MessageService.publish_event(
+                chat_room.id,
+                'read_receipt',
+                {'user_id': user.id, 'last_read_message_id': message_id}
+            )
+            MessageService.publish_inbox_event(
+                user.id,
+                'inbox_read',
+                {'room_id': chat_room.id, 'unread_count': unread_count}
+            )
+
+        transaction.on_commit(publish)
+        return message_id
+
+    @staticmethod
+    @transaction.atomic
+    def delete_message(message):
+        message.delete()
+        chat_room = message.chat_room
+
+        if chat_room.last_message_id == message.id:
+            chat_room.last_message = Message.objects.filter(chat_room=chat_room).order_by('-id').first()
+            chat_room.save(update_fields=['last_message'])
+
+        ChatReadState.objects.filter(
+            chat_room=chat_room,
+            unread_count__gt=0
+        ).exclude(
+            user_id=message.sender_id
+        ).filter(
+            Q(last_read_message__isnull=True) | Q(last_read_message_id__lt=message.id)
+        ).update(unread_count=F('unread_count') - 1)
+
+    @staticmethod
+    def get_unread_count(chat_room_id, user):
+        return ChatReadState.objects.filter(
+            chat_room_id=chat_room_id,
+            user=user
+        ).values_list('unread_count', flat=True).first() or 0
+
+
+class ChatUploadService:
+    READ_SIZE = 64 * 1024
+
+    @staticmethod
+    def temp_path(upload):
+        return os.path.join(settings.CHAT_UPLOAD_TEMP_DIR, f'{upload.id}.part')
+
+    @staticmethod
+    def start_upload(chat_room, user, filename, content_type, size):
+        if size > settings.CHAT_UPLOAD_MAX_SIZE:
+            raise exceptions.ValidationError({'size': f"Files larger than {settings.CHAT_UPLOAD_MAX_SIZE} bytes are not allowed."})
+
+        upload = ChatUpload.objects.create(
+            chat_room=chat_room,
+            user=user,
+            filename=os.path.basename(filename),
+            content_type=content_type,
+            size=size
+        )
+        os.makedirs(settings.CHAT_UPLOAD_TEMP_DIR, exist_ok=True)
+        open(ChatUploadService.temp_path(upload), 'wb').close()
+        return upload
+
+    @staticmethod
+    @transaction.atomic
+    def append_chunk(upload, offset, stream):
+        upload = ChatUpload.objects.select_for_update().get(id=upload.id)
+        if upload.is_complete:
+            raise exceptions.ValidationError({'offset': "This upload is already complete."})
+        if offset != upload.received:
+            raise exceptions.ValidationError({'offset': f"Expected offset {upload.received}."})
+
+        limit = min(settings.CHAT_UPLOAD_CHUNK_SIZE, upload.size - upload.received)
+        written = 0
+        with open(ChatUploadService.temp_path(upload), 'r+b') as part:
+            part.seek(upload.received)
+            while stream is not None:
+                data = stream.read(ChatUploadService.READ_SIZE)
+                if not data:
+                    break
+                written += len(data)
+                if written > limit:
+                    part.truncate(upload.received)
+                    raise exceptions.ValidationError({'chunk': f"Chunks may not exceed {limit} bytes."})
+                part.write(data)
+            part.truncate(upload.received + written)
+
+        upload.received += written
+        upload.save(update_fields=['received', 'updated_at'])
+
+        if upload.received == upload.size:
+            ChatUploadService.finish_upload(upload)
+        return upload
+
+    @staticmethod
+    def finish_upload(upload):
+        path = ChatUploadService.temp_path(upload)
+        digest = hashlib.sha256()
+        with open(path, 'rb') as part:
+            for data in iter(lambda: part.read(ChatUploadService.READ_SIZE), b''):
+                digest.update(data)
+
+        sha256 = digest.hexdigest()
+        attachment = ChatAttachment.objects.filter(sha256=sha256).first()
+        if attachment is None:
+            attachment = ChatAttachment(
+                sha256=sha256,
+                content_type=upload.content_type,
+                size=upload.size
+            )
+            with open(path, 'rb') as part:
+                attachment.file.save(upload.filename, File(part), save=False)
+            try:
+                with transaction.atomic():
+                    attachment.save()
+            except IntegrityError:
+                attachment.file.delete(save=False)
+                attachment = ChatAttachment.objects.get(sha256=sha256)
+            else:
+                if attachment.is_image:
+                    from .tasks import generate_attachment_thumbnails
+                    transaction.on_commit(lambda: generate_attachment_thumbnails.delay(attachment.id))
+
+        upload.attachment = attachment
+        upload.save(update_fields=['attachment', 'updated_at'])
+        transaction.on_commit(lambda: os.remove(path))
+        return attachment
+
+    @staticmethod
+    def generate_thumbnails(attachment):
+        from PIL import Image, ImageOps
+
+        with attachment.file.open('rb') as source:
+            image = ImageOps.exif_transpose(Image.open(source))
+            attachment.width, attachment.height = image.size
+            image = image.convert('RGB')
+
+            for field, size in (('preview', settings.CHAT_PREVIEW_SIZE), ('thumbnail', settings.CHAT_THUMBNAIL_SIZE)):
+                image.thumbnail(size)
+                output = io.BytesIO()
+                image.save(output, format='JPEG', quality=80, optimize=True)
+                getattr(attachment, field).save(f'{attachment.sha256}.jpg', ContentFile(output.getvalue()), save=False)
+
+        attachment.save(update_fields=['thumbnail', 'preview', 'width', 'height'])
+
+        messages = Message.objects.filter(attachment=attachment).values_list('chat_room_id', flat=True).distinct()
+        attachment_data = ChatAttachmentSerializer(attachment).data
+        for chat_room_id in messages:
+            MessageService.publish_event(chat_room_id, 'attachment_ready', {'attachment': attachment_data})
+
+    @staticmethod
+    def cleanup_stale_uploads():
+        stale = ChatUpload.objects.filter(
+            attachment__isnull=True,
+            updated_at__lt=timezone.now() - timedelta(seconds=settings.CHAT_UPLOAD_EXPIRY)
+        )
+        removed = 0
+        for upload in stale.iterator():
+            path = ChatUploadService.temp_path(upload)
+            if os.path.exists(path):
+                os.remove(path)
+            removed += 1
+        stale.delete()
+        return removed
+
+
+class MessageArchiveService:
+    FIELDS = ['id', 'sender_id', 'content', 'image', 'file', 'attachment_id', 'client_message_id', 'created_at', 'updated_at']
+
+    @staticmethod
+    def archive_messages(older_than_days=None):
+        older_than_days = older_than_days or settings.CHAT_ARCHIVE_AFTER_DAYS
+        cutoff = timezone.now() - timedelta(days=older_than_days)
+        chat_room_ids = Message.objects.all_with_deleted().filter(
+            created_at__lt=cutoff
+        ).order_by().values_list('chat_room_id', flat=True).distinct()
+
+        archived = 0
+        for chat_room in ChatRoom.objects.filter(id__in=chat_room_ids).iterator():
+            archived += MessageArchiveService.archive_room(chat_room, cutoff)
+        return archived
+
+    @staticmethod
+    def archive_room(chat_room, cutoff):
+        archived = 0
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    Message.objects.all_with_deleted().filter(
+                        chat_room=chat_room,
+                        created_at__lt=cutoff
+                    ).exclude(
+                        id=chat_room.last_message_id
+                    ).order_by('created_at', 'id').values('is_deleted', *MessageArchiveService.FIELDS)[
+                        :settings.CHAT_ARCHIVE_SEGMENT_SIZE
+                    ]
+                )
+                if not batch:
+                    return archived
+
+                rows = [row for row in batch if not row.pop('is_deleted')]
+                if rows:
+                    MessageArchiveService.write_segment(chat_room, rows)
+                Message.objects.all_with_deleted().filter(id__in=[row['id'] for row in batch]).hard_delete()
+                archived += len(rows)
+
+    @staticmethod
+    def write_segment(chat_room, rows):
+        output = io.BytesIO()
+        with gzip.GzipFile(fileobj=output, mode='wb') as archive:
+            for row in rows:
+                archive.write(json.dumps(row, cls=DjangoJSONEncoder).encode() + b'\n')
+
+        segment = MessageArchiveSegment(
+            chat_room=chat_room,
+            first_message_id=rows[0]['id'],
+            last_message_id=rows[-1]['id'],
+            first_created_at=rows[0]['created_at'],
+            last_created_at=rows[-1]['created_at'],
+            message_count=len(rows)
+        )
+        segment.file.save(
+            f"{chat_room.id}/{rows[0]['id']}-{rows[-1]['id']}.jsonl.gz",
+            ContentFile(output.getvalue()),
+            save=False
+        )
+        segment.save()
+        return segment
+
+    @staticmethod
+    def read_segment(segment):
+        with segment.file.open('rb') as source, gzip.GzipFile(fileobj=source) as archive:
+            rows = [json.loads(line) for line in archive]
+
+        for row in rows:
+            row['created_at'] = parse_datetime(row['created_at'])
+            row['updated_at'] = parse_datetime(row['updated_at'])
+        return rows
+
+    @staticmethod
+    def get_messages(chat_room_id, before=None, after=None, limit=20):
+        cursor = before if after is None else after
+        key = None
+        if cursor is not None:
+            created_at = parse_datetime(cursor[0]) if isinstance(cursor[0], str) else cursor[0]
+            key = (created_at, cursor[1])
+
+        segments = MessageArchiveSegment.objects.filter(chat_room_id=chat_room_id)
+        if after is not None:
+            segments = segments.filter(
+                Q(last_created_at__gt=key[0]) | Q(last_created_at=key[0], last_message_id__gt=key[1])
+            ).order_by('first_created_at', 'first_message_id')
+        else:
+            if key is not None:
+                segments = segments.filter(
+                    Q(first_created_at__lt=key[0]) | Q(first_created_at=key[0], first_message_id__lt=key[1])
+                )
+            segments = segments.order_by('-first_created_at', '-first_message_id')
+
+        rows = []
+        for segment in segments:
+            segment_rows = MessageArchiveService.read_segment(segment)
+            if after is not None:
+                rows.extend(row for row in segment_rows if (row['created_at'], row['id']) > key)
+                rows = rows[:limit]
+            else:
+                rows = [row for row in segment_rows if key is None or (row['created_at'], row['id']) < key] + rows
+                rows = rows[-limit:]
+            if len(rows) >= limit:
+                break
+
+        return MessageArchiveService.hydrate(chat_room_id, rows)
+
+    @staticmethod
+    def hydrate(chat_room_id, rows):
+        senders = User.objects.in_bulk({row['sender_id'] for row in rows})
+        attachments = ChatAttachment.objects.in_bulk({row['attachment_id'] for row in rows if row['attachment_id']})
+
+        messages = []
+        for row in rows:
+            if row['sender_id'] not in senders:
+                continue
+            message = Message(chat_room_id=chat_room_id, **row)
+            message.sender = senders[row['sender_id']]
+            message.attachment = attachments.get(row['attachment_id'])
+            messages.append(message)
+        return messages
@@ -0,0 +1,36 @@
+from celery import shared_task
+from .models import ChatAttachment, ChatRoom
+from .services import ChatUploadService, MessageArchiveService, MessageService
+from users.models import User
+
+
+@shared_task
+def generate_attachment_thumbnails(attachment_id):
+    attachment = ChatAttachment.objects.filter(id=attachment_id).first()
+    if attachment is not None:
+        ChatUploadService.generate_thumbnails(attachment)
+
+
+@shared_task
+def cleanup_stale_uploads():
+    return ChatUploadService.cleanup_stale_uploads()
+
+
+@shared_task
+def archive_chat_messages(older_than_days=None):
+    return MessageArchiveService.archive_messages(older_than_days)
+
+
+@shared_task(autoretry_for=(Exception,), retry_backoff=True, max_retries=8)
+def save_chat_message(chat_room_id, sender_id, content, client_message_id=None):
+    chat_room = ChatRoom.objects.filter(id=chat_room_id).first()
+    sender = User.objects.filter(id=sender_id).first()
+    if chat_room is None or sender is None:
+        return None
+
+    return MessageService.create_message(
+        chat_room=chat_room,
+        sender=sender,
+        content=content,
+        client_message_id=client_message_id
+    ).id
@@ -1,3 +1,449 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import shutil
+import tempfile
+import unittest
+import uuid
+from datetime import timedelta
+from unittest import mock
+from asgiref.sync import async_to_sync
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.db import connection
+from django.core.files.storage import FileSystemStorage
+from django.db.models import QuerySet
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from core.enums import UserType
+from users.models import User, ClientProfile, DietitianProfile
+from .buffer import MessageWriteBuffer
+from .middleware import JWTAuthMiddleware
+from .routing import websocket_urlpatterns
+from .models import ChatRoom, Message, ChatAttachment, ChatUpload, ChatReadState, MessageArchiveSegment
+from .services import MessageService, ChatUploadService, MessageArchiveService
 
-# Create your tests here.
+CHAT_TEST_SETTINGS = {
+    'CHANNEL_LAYERS': {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+}
+
+
+def create_chat_room():
+    suffix = uuid.uuid4().hex[:8]
+    client_user = User.objects.create_user(
+        email=f'client-{suffix}@example.com',
+        password='password',
+        user_type=UserType.CLIENT
+    )
+    dietitian_user = User.objects.create_user(
+        email=f'dietitian-{suffix}@example.com',
+        password='password',
+        user_type=UserType.DIETITIAN
+    )
+    return ChatRoom.objects.create(
+        client=ClientProfile.objects.create(user=client_user),
+        dietitian=DietitianProfile.objects.create(user=dietitian_user)
+    )
+
+
+def collect_pages(test_client, url, params=None):
+    ids = []
+    response = test_client.get(url, params)
+    while True:
+        ids.extend(message['id'] for message in response.data['results'])
+        if not response.data['next']:
+            return ids
+        response = test_client.get(response.data['next'])
+
+
+class JWTAuthMiddlewareTests(unittest.TestCase):
+    def get_raw_token(self, authorization):
+        return JWTAuthMiddleware(None).get_raw_token({'headers': [(b'authorization', authorization)]})
+
+    def test_reads_bearer_token_from_header(self):
+        self.assertEqual(self.get_raw_token(b'Bearer abc.def.ghi'), b'abc.def.ghi')
+
+    def test_malformed_header_is_treated_as_anonymous(self):
+        self.assertIsNone(self.get_raw_token(b'Bearer two parts'))
+
+
+@override_settings(**CHAT_TEST_SETTINGS)
+class MessageWriteBufferTests(TransactionTestCase):
+    def setUp(self):
+        self.room = create_chat_room()
+        self.sender = self.room.client.user
+        self.buffer = MessageWriteBuffer(batch_size=10, flush_interval=0.01, max_pending=100, drain_timeout=5)
+
+    def build_message(self, index):
+        return Message(
+            chat_room=self.room,
+            sender=self.sender,
+            content=f'message {index}',
+            client_message_id=uuid.uuid4()
+        )
+
+    def test_put_returns_future_resolved_after_write(self):
+        async def send():
+            written = [await self.buffer.put(self.build_message(index)) for index in range(25)]
+            done, pending = await asyncio.wait(written, timeout=5)
+            return len(done), len(pending)
+
+        self.assertEqual(async_to_sync(send)(), (25, 0))
+        self.assertEqual(Message.objects.filter(chat_room=self.room).count(), 25)
+
+    def test_drain_writes_queued_messages_after_flusher_dies(self):
+        async def send():
+            await self.buffer.put(self.build_message(0))
+            self.buffer.flusher.cancel()
+            await asyncio.sleep(0)
+            for index in range(1, 5):
+                await self.buffer.put(self.build_message(index))
+            await self.buffer.drain()
+
+        async_to_sync(send)()
+        self.assertEqual(Message.objects.filter(chat_room=self.room).count(), 5)
+
+    def test_failed_writes_are_dead_lettered(self):
+        async def send():
+            written = await self.buffer.put(self.build_message(0))
+            await asyncio.wait_for(written, timeout=5)
+
+        with mock.patch('chat.buffer.MessageService.create_messages', side_effect=RuntimeError), \
+                mock.patch('chat.buffer.MessageService.create_message', side_effect=RuntimeError), \
+                mock.patch('chat.tasks.save_chat_message.delay') as delay, \
+                self.assertLogs('chat.buffer', level='ERROR'):
+            async_to_sync(send)()
+
+        delay.assert_called_once()
+        self.assertEqual(delay.call_args.args[:3], (self.room.id, self.sender.id, 'message 0'))
+        self.assertFalse(Message.objects.filter(chat_room=self.room).exists())
+
+
+@override_settings(**CHAT_TEST_SETTINGS, CHAT_WRITE_BEHIND=False)
+class ChatConsumerFrameTests(TransactionTestCase):
+    def setUp(self):
+        self.room = create_chat_room()
+        self.user = self.room.client.user
+
+    def test_malformed_frames_get_error_events(self):
+        frames = [
+            'not json',
+            '[1, 2]',
+            '{"type": "delivered", "message_id": "abc"}',
+            '{"type": "delivered"}',
+            '{"type": "read", "message_id": 999999}',
+            '{"type": "chat_message"}',
+            '{"type": "chat_message", "message": 5}',
+            '{"type": "chat_message", "message": "hi", "client_message_id": "nope"}',
+            '{"type": "unknown"}',
+        ]
+
+        async def exchange():
+            communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f'/ws/chat/{self.room.id}/')
+            communicator.scope['user'] = self.user
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            self.assertEqual(await communicator.receive_json_from(), {
+                'type': 'connected',
+                'heartbeat_interval': settings.PRESENCE_HEARTBEAT_INTERVAL,
+                'presence_ttl': settings.PRESENCE_TTL,
+            })
+
+            responses = []
+            for frame in frames:
+                await communicator.send_to(text_data=frame)
+                responses.append(await communicator.receive_json_from())
+
+            await communicator.send_json_to({'type': 'chat_message', 'message': 'still connected'})
+            responses.append(await communicator.receive_json_from())
+            await communicator.disconnect()
+            return responses
+
+        responses = async_to_sync(exchange)()
+
+        self.assertEqual([response['type'] for response in responses[:-1]], ['error'] * len(frames))
+        self.assertEqual(responses[-1]['type'], 'chat_message')
+        self.assertEqual(responses[-1]['message_data']['content'], 'still connected')
+
+
+@override_settings(**CHAT_TEST_SETTINGS)
+class ChatUploadTests(APITestCase):
+    def setUp(self):
+        self.storage_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.storage_dir, ignore_errors=True)
+        storage_settings = override_settings(
+            MEDIA_ROOT=self.storage_dir,
+            CHAT_UPLOAD_TEMP_DIR=self.storage_dir,
+            CHAT_UPLOAD_CHUNK_SIZE=4
+        )
+        storage_settings.enable()
+        self.addCleanup(storage_settings.disable)
+
+        self.room = create_chat_room()
+        self.user = self.room.client.user
+        self.client.force_authenticate(self.user)
+
+    def start_upload(self, size, content_type='application/pdf'):
+        response = self.client.post(
+            reverse('chat-upload-create', args=[self.room.id]),
+            {'filename': 'report.pdf', 'content_type': content_type, 'size': size},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def send_chunk(self, upload_id, offset, data):
+        return self.client.generic(
+            'PUT',
+            reverse('chat-upload-chunk', args=[upload_id]),
+            data,
+            content_type='application/offset+octet-stream',
+            HTTP_UPLOAD_OFFSET=str(offset)
+        )
+
+    def upload(self, content):
+        upload_id = self.start_upload(len(content))
+        for offset in range(0, len(content), 4):
+            response = self.send_chunk(upload_id, offset, content[offset:offset + 4])
+            self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_chunks_are_assembled_into_attachment(self):
+        data = self.upload(b'hello world')
+
+        self.assertEqual(data['received'], 11)
+        attachment = ChatAttachment.objects.get(id=data['attachment']['id'])
+        self.assertEqual(attachment.sha256, hashlib.sha256(b'hello world').hexdigest())
+        with attachment.file.open('rb') as stored:
+            self.assertEqual(stored.read(), b'hello world')
+
+    def test_offset_mismatch_is_rejected(self):
+        upload_id = self.start_upload(8)
+        self.assertEqual(self.send_chunk(upload_id, 0, b'abcd').status_code, 200)
+
+        response = self.send_chunk(upload_id, 0, b'abcd')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(ChatUpload.objects.get(id=upload_id).received, 4)
+
+    def test_identical_uploads_share_attachment(self):
+        first = self.upload(b'same bytes')
+        second = self.upload(b'same bytes')
+
+        self.assertEqual(first['attachment']['id'], second['attachment']['id'])
+        self.assertEqual(ChatAttachment.objects.count(), 1)
+
+    def test_upload_can_only_be_attached_in_its_room(self):
+        upload_id = self.upload(b'room bytes')['id']
+        other_room = ChatRoom.objects.create(client=self.room.client, dietitian=create_chat_room().dietitian)
+
+        response = self.client.post(
+            reverse('message-list-create', args=[other_room.id]),
+            {'upload_id': upload_id},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('upload_id', response.data)
+
+        response = self.client.post(
+            reverse('message-list-create', args=[self.room.id]),
+            {'upload_id': upload_id},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNotNone(response.data['attachment'])
+
+    def test_concurrent_finish_reuses_committed_attachment(self):
+        existing = self.upload(b'raced bytes')['attachment']
+        upload = ChatUploadService.start_upload(self.room, self.user, 'raced.png', 'image/png', 11)
+        with open(ChatUploadService.temp_path(upload), 'wb') as part:
+            part.write(b'raced bytes')
+
+        with mock.patch.object(QuerySet, 'first', return_value=None), \
+                mock.patch('chat.tasks.generate_attachment_thumbnails.delay') as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            attachment = ChatUploadService.finish_upload(upload)
+
+        self.assertEqual(attachment.id, existing['id'])
+        self.assertEqual(ChatAttachment.objects.count(), 1)
+        delay.assert_not_called()
+
+    def test_attachment_ready_published_when_thumbnail_finished_before_commit(self):
+        attachment = ChatAttachment.objects.create(
+            sha256='0' * 64,
+            file='chat/attachments/photo.png',
+            content_type='image/png',
+            size=1
+        )
+        with mock.patch('chat.services.MessageService.publish_event') as publish_event:
+            with self.captureOnCommitCallbacks(execute=False) as callbacks:
+                MessageService.create_message(self.room, self.user, attachment=attachment)
+            ChatAttachment.objects.filter(id=attachment.id).update(thumbnail='chat/thumbnails/photo.jpg')
+            for callback in callbacks:
+                callback()
+
+        ready_events = [call.args for call in publish_event.call_args_list if call.args[1] == 'attachment_ready']
+        self.assertEqual(len(ready_events), 1)
+        self.assertEqual(ready_events[0][0], self.room.id)
+
+
+@override_settings(**CHAT_TEST_SETTINGS)
+class ReadStateTests(APITestCase):
+    def setUp(self):
+        self.room = create_chat_room()
+        self.client_user = self.room.client.user
+        self.dietitian_user = self.room.dietitian.user
+
+    def read_state(self, user):
+        return ChatReadState.objects.get(chat_room=self.room, user=user)
+
+    def test_sending_publishes_read_receipt_for_moved_watermark(self):
+        MessageService.create_message(self.room, self.dietitian_user, content='hello')
+        with mock.patch('chat.services.MessageService.publish_event') as publish_event, \
+                self.captureOnCommitCallbacks(execute=True):
+            message = MessageService.create_message(self.room, self.client_user, content='hi')
+
+        self.assertEqual(self.read_state(self.client_user).last_read_message_id, message.id)
+        publish_event.assert_any_call(
+            self.room.id,
+            'read_receipt',
+            {'user_id': self.client_user.id, 'last_read_message_id': message.id}
+        )
+
+
+    def test_partial_read_counts_unread_messages(self):
+        message_ids = [
+            MessageService.create_message(self.room, self.dietitian_user, content=f'tip {index}').id
+            for index in range(5)
+        ]
+
+        with mock.patch('chat.services.MessageService.publish_inbox_event') as publish_inbox_event, \
+                self.captureOnCommitCallbacks(execute=True):
+            MessageService.mark_read(self.room, self.client_user, message_ids[1])
+
+        self.assertEqual(self.read_state(self.client_user).unread_count, 3)
+        publish_inbox_event.assert_called_once_with(
+            self.client_user.id,
+            'inbox_read',
+            {'room_id': self.room.id, 'unread_count': 3}
+        )
+
+    def test_full_read_uses_stored_last_message(self):
+        for index in range(3):
+            MessageService.create_message(self.room, self.dietitian_user, content=f'tip {index}')
+        stale_room = ChatRoom.objects.get(id=self.room.id)
+        newest = MessageService.create_message(self.room, self.dietitian_user, content='late tip')
+
+        self.assertEqual(MessageService.mark_read(stale_room, self.client_user), newest.id)
+
+        state = self.read_state(self.client_user)
+        self.assertEqual(state.last_read_message_id, newest.id)
+        self.assertEqual(state.unread_count, 0)
+
+    def test_mark_room_read_validates_message_id(self):
+        other_room = create_chat_room()
+        other_message = MessageService.create_message(other_room, other_room.client.user, content='elsewhere')
+        MessageService.create_message(self.room, self.dietitian_user, content='hello')
+        self.client.force_authenticate(self.client_user)
+        url = reverse('mark-room-read', args=[self.room.id])
+
+        for message_id in ('abc', 0, other_message.id):
+            response = self.client.post(url, {'message_id': message_id})
+            self.assertEqual(response.status_code, 400, message_id)
+
+        response = self.client.post(url, {})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['last_read_message_id'], self.room.last_message_id)
+
+
+@override_settings(**CHAT_TEST_SETTINGS, CHAT_ARCHIVE_SEGMENT_SIZE=4)
+class MessageHistoryPaginationTests(APITestCase):
+    def setUp(self):
+        archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, archive_dir, ignore_errors=True)
+        storage = mock.patch.object(
+            MessageArchiveSegment._meta.get_field('file'),
+            'storage',
+            FileSystemStorage(location=archive_dir)
+        )
+        storage.start()
+        self.addCleanup(storage.stop)
+
+        self.room = create_chat_room()
+        self.user = self.room.client.user
+        self.client.force_authenticate(self.user)
+        self.url = reverse('message-list-create', args=[self.room.id])
+
+    def create_messages(self, count, archived=0):
+        message_ids = [
+            MessageService.create_message(self.room, self.user, content=f'note {index}').id
+            for index in range(count)
+        ]
+        started = timezone.now() - timedelta(days=400)
+        for index, message_id in enumerate(message_ids[:archived]):
+            Message.objects.filter(id=message_id).update(created_at=started + timedelta(minutes=index))
+        return message_ids
+
+    def walk(self, response, link):
+        ids = []
+        while True:
+            page_ids = [message['id'] for message in response.data['results']]
+            ids = ids + page_ids if link == 'next' else page_ids + ids
+            if not response.data[link]:
+                return ids, response
+            response = self.client.get(response.data[link])
+
+    def assert_pages_cover(self, message_ids):
+        newest = self.client.get(self.url, {'page_size': 3})
+        self.assertEqual([message['id'] for message in newest.data['results']], message_ids[-3:])
+        self.assertIsNone(newest.data['next'])
+
+        backward, oldest = self.walk(newest, 'previous')
+        self.assertEqual(backward, message_ids)
+        self.assertEqual([message['id'] for message in oldest.data['results']], message_ids[:len(message_ids) % 3])
+
+        forward, _ = self.walk(oldest, 'next')
+        self.assertEqual(forward, message_ids)
+
+    def test_pages_before_and_after_without_gaps(self):
+        self.assert_pages_cover(self.create_messages(11))
+
+    def test_pages_cross_archive_boundary(self):
+        message_ids = self.create_messages(14, archived=9)
+        self.assertEqual(MessageArchiveService.archive_messages(), 9)
+        self.assertEqual(MessageArchiveSegment.objects.filter(chat_room=self.room).count(), 3)
+        self.assertEqual(Message.objects.filter(chat_room=self.room).count(), 5)
+
+        self.assert_pages_cover(message_ids)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', "Full-text search requires PostgreSQL.")
+@override_settings(**CHAT_TEST_SETTINGS)
+class MessageSearchPaginationTests(APITestCase):
+    def setUp(self):
+        self.room = create_chat_room()
+        self.user = self.room.client.user
+        self.client.force_authenticate(self.user)
+
+    def test_equal_rank_results_page_without_duplicates_or_gaps(self):
+        message_ids = [
+            MessageService.create_message(self.room, self.user, content='protein breakfast ideas').id
+            for _ in range(23)
+        ]
+        message_ids.append(MessageService.create_message(self.room, self.user, content='protein protein shake').id)
+
+        ids = collect_pages(self.client, reverse('message-search'), {'q': 'prot', 'page_size': 5})
+
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(set(ids), set(message_ids))
+
+    def test_empty_query_returns_no_results(self):
+        MessageService.create_message(self.room, self.user, content='protein breakfast ideas')
+
+        for query in ('', '  ', '!?'):
+            response = self.client.get(reverse('message-search'), {'q': query})
+            self.assertEqual(response.status_code, 200, query)
+            self.assertEqual(response.data['results'], [])
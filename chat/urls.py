@@ -6,6 +6,7 @@ urlpatterns = [
     path('rooms/<int:pk>/', views.ChatRoomRetrieveView.as_view(), name='chat-room-retrieve'),
 
     path('rooms/<int:chat_room_id>/messages/', views.MessageListCreateView.as_view(), name='message-list-create'),
+    path('messages/search/', views.MessageSearchView.as_view(), name='message-search'),
     path('messages/<int:pk>/', views.MessageRetrieveUpdateDestroyView.as_view(), name='message-retrieve-update-destroy'),
 
     path('messages/<int:message_id>/read/', views.MessageReadView.as_view(), name='message-read'),
@@ -13,4 +14,8 @@ urlpatterns = [
     path('rooms/<int:chat_room_id>/unread-count/', views.UnreadMessageCountView.as_view(), name='unread-message-count'),
     
     path('rooms/<int:chat_room_id>/mark-messages-as-read/', views.MarkMessagesAsReadView.as_view(), name='mark-messages-as-read'),
+    path('rooms/<int:chat_room_id>/read/', views.MarkRoomReadView.as_view(), name='mark-room-read'),
+
+    path('rooms/<int:chat_room_id>/uploads/', views.ChatUploadCreateView.as_view(), name='chat-upload-create'),
+    path('uploads/<uuid:pk>/', views.ChatUploadChunkView.as_view(), name='chat-upload-chunk'),
 ]
\ No newline at end of file
@@ -1,19 +1,22 @@
 from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from django.db.models import Q
-from .models import ChatRoom, Message, MessageRead
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from django.db.models import Max
+from .models import ChatRoom, Message, ChatUpload
 from .serializers import (
     ChatRoomSerializer, 
     MessageSerializer,
-    MessageReadSerializer,ChatRoomCreateSerializer
+    MessageReadSerializer,ChatRoomCreateSerializer,
+    ChatUploadSerializer, MessageSearchSerializer,
+    MarkRoomReadSerializer
 )
 from .permissions import IsClientOrDietitian
 from .permissions import IsChatRoomParticipant, IsMessageSender
-from rest_framework.parsers import MultiPartParser, FormParser
-from users.models import ClientProfile, DietitianProfile
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
+from .services import ChatRoomService, MessageService, ChatUploadService
+from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from core.pagination import KeysetPagination
+from .pagination import MessageHistoryPagination
 
 class ChatRoomListCreateView(generics.ListCreateAPIView):
     queryset = ChatRoom.objects.all()
@@ -21,18 +24,7 @@ class ChatRoomListCreateView(generics.ListCreateAPIView):
 
 
     def get_queryset(self):
-        user = self.request.user
-
-        if ClientProfile.objects.filter(user=user).exists():
-            return ChatRoom.objects.filter(client__user=user)
-
-        if DietitianProfile.objects.filter(user=user).exists():
-            return ChatRoom.objects.filter(dietitian__user=user)
-
-        if user.is_staff:
-            return ChatRoom.objects.all()
-
-        return ChatRoom.objects.none()
+        return ChatRoomService.get_user_rooms(self.request.user)
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -51,27 +43,39 @@ class ChatRoomRetrieveView(generics.RetrieveAPIView):
     serializer_class = ChatRoomSerializer
     permission_classes = [IsAuthenticated, IsChatRoomParticipant]
 
+    def get_queryset(self):
+        return ChatRoomService.with_read_state(ChatRoom.objects.all(), self.request.user)
+
 class MessageListCreateView(generics.ListCreateAPIView):
     serializer_class = MessageSerializer
     permission_classes = [IsAuthenticated, IsChatRoomParticipant]
-    parser_classes = (MultiPartParser, FormParser)
+    parser_classes = (MultiPartParser, FormParser, JSONParser)
+
+    pagination_class = MessageHistoryPagination
+    keyset_ordering = ('created_at', 'id')
 
     def get_queryset(self):
         chat_room_id = self.kwargs['chat_room_id']
-        return Message.objects.filter(chat_room_id=chat_room_id)
+        return Message.objects.filter(chat_room_id=chat_room_id).select_related('sender', 'attachment')
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['chat_room_id'] = self.kwargs['chat_room_id']
+        return context
 
     def perform_create(self, serializer):
         chat_room = ChatRoom.objects.get(id=self.kwargs['chat_room_id'])
-        message = serializer.save(chat_room=chat_room, sender=self.request.user)
-        message.refresh_from_db()
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            f"chat_{chat_room.id}",
-            {
-                "type": "chat_message",
-                "message_data": MessageSerializer(message, context={'request': self.request}).data
-            }
+        data = serializer.validated_data.copy()
+        upload = data.pop('upload_id', None)
+        if upload is not None:
+            data['attachment'] = upload.attachment
+
+        message = MessageService.create_message(
+            chat_room=chat_room,
+            sender=self.request.user,
+            **data
         )
+        serializer.instance = message
 
 class MessageRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Message.objects.all()
@@ -87,6 +91,10 @@ class MessageRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
             serializer.save()
         else:
             serializer.save(sender=self.request.user)
+        MessageService.update_search_vectors([serializer.instance.id])
+
+    def perform_destroy(self, instance):
+        MessageService.delete_message(instance)
 
 class MessageReadView(generics.CreateAPIView):
     permission_classes = [IsAuthenticated, IsClientOrDietitian]
@@ -103,10 +111,7 @@ class MessageReadView(generics.CreateAPIView):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        MessageRead.objects.get_or_create(
-            message=message,
-            user=request.user
-        )
+        MessageService.mark_read(chat_room, request.user, message.id)
 
         return Response(
             {"detail": "Message marked as read."},
@@ -117,13 +122,7 @@ class UnreadMessageCountView(generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request, *args, **kwargs):
-        chat_room_id = self.kwargs['chat_room_id']
-        unread_count = Message.objects.filter(
-            chat_room_id=chat_room_id
-        ).exclude(
-            message_read__user=request.user
-        ).count()
-        
+        unread_count = MessageService.get_unread_count(self.kwargs['chat_room_id'], request.user)
         return Response({'unread_count': unread_count})
 
 class MarkMessagesAsReadView(generics.CreateAPIView):
@@ -132,16 +131,92 @@ class MarkMessagesAsReadView(generics.CreateAPIView):
     def create(self, request, *args, **kwargs):
         chat_room_id = self.kwargs['chat_room_id']
         message_ids = request.data.get('message_ids', [])
-        
-        messages = Message.objects.filter(
+
+        chat_room = generics.get_object_or_404(ChatRoom.objects.select_related('client', 'dietitian'), id=chat_room_id)
+        if request.user.id not in chat_room.participant_ids:
+            return Response(
+                {"detail": "You are not part of this chat room."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        last_read_message_id = Message.objects.filter(
             id__in=message_ids,
-            chat_room_id=chat_room_id
+            chat_room=chat_room
+        ).aggregate(last_read_message_id=Max('id'))['last_read_message_id']
+
+        if last_read_message_id:
+            MessageService.mark_read(chat_room, request.user, last_read_message_id)
+
+        return Response(status=status.HTTP_200_OK)
+
+class MarkRoomReadView(generics.CreateAPIView):
+    serializer_class = MarkRoomReadSerializer
+    permission_classes = [IsAuthenticated]
+
+    def create(self, request, *args, **kwargs):
+        chat_room = generics.get_object_or_404(
+            ChatRoom.objects.select_related('client', 'dietitian'),
+            id=self.kwargs['chat_room_id']
         )
-        
-        for message in messages:
-            MessageRead.objects.get_or_create(
-                user=request.user,
-                message=message
+        if request.user.id not in chat_room.participant_ids:
+            return Response(
+                {"detail": "You are not part of this chat room."},
+                status=status.HTTP_403_FORBIDDEN
             )
-        
-        return Response(status=status.HTTP_200_OK) 
+
+        serializer = self.get_serializer(
+            data=request.data,
+            context={**self.get_serializer_context(), 'chat_room': chat_room}
+        )
+        serializer.is_valid(raise_exception=True)
+
+        last_read_message_id = MessageService.mark_read(
+            chat_room,
+            request.user,
+            serializer.validated_data.get('message_id')
+        )
+        return Response({'last_read_message_id': last_read_message_id}, status=status.HTTP_200_OK)
+
+class ChatUploadCreateView(generics.CreateAPIView):
+    serializer_class = ChatUploadSerializer
+    permission_classes = [IsAuthenticated]
+
+    def perform_create(self, serializer):
+        chat_room = generics.get_object_or_404(
+            ChatRoom.objects.select_related('client', 'dietitian'),
+            id=self.kwargs['chat_room_id']
+        )
+        if self.request.user.id not in chat_room.participant_ids:
+            raise PermissionDenied("You are not part of this chat room.")
+
+        serializer.instance = ChatUploadService.start_upload(
+            chat_room=chat_room,
+            user=self.request.user,
+            **serializer.validated_data
+        )
+
+class ChatUploadChunkView(generics.RetrieveAPIView):
+    serializer_class = ChatUploadSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return ChatUpload.objects.filter(user=self.request.user).select_related('attachment')
+
+    def put(self, request, *args, **kwargs):
+        upload = self.get_object()
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+        except ValueError:
+            raise ValidationError({'offset': "The Upload-Offset header is required."})
+
+        upload = ChatUploadService.append_chunk(upload, offset, request.stream)
+        return Response(self.get_serializer(upload).data)
+
+class MessageSearchView(generics.ListAPIView):
+    serializer_class = MessageSearchSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-rank', '-id')
+
+    def get_queryset(self):
+        return MessageService.search_messages(self.request.user, self.request.query_params.get('q', ''))
@@ -0,0 +1,194 @@
+import base64
+import json
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class StandardResultsSetPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class KeysetPagination(BasePagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering = ('-id',)
+    cursor_fields = None
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def get_ordering(self, view):
+        return tuple(getattr(view, 'keyset_ordering', self.ordering))
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def encode_cursor(self, values):
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in values]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        if self.cursor_fields is None:
+            return values
+
+        try:
+            values = [field.to_python(value) for field, value in zip(self.cursor_fields, values)]
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if any(value is None for value in values):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def get_cursor_fields(self, queryset):
+        fields = []
+        for field in self.ordering:
+            name = field.lstrip('-')
+            if name in queryset.query.annotations:
+                fields.append(queryset.query.annotations[name].output_field)
+            else:
+                fields.append(queryset.model._meta.get_field(name))
+        return fields
+
+    def get_keyset_values(self, obj):
+        return [getattr(obj, field.lstrip('-')) for field in self.ordering]
+
+    def get_keyset_filter(self, values, reverse=False):
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            descending = field.startswith('-') != reverse
+            lookup = 'lt' if descending else 'gt'
+
+            step = Q(**{f"{field.lstrip('-')}__{lookup}": values[index]})
+            for previous_field, value in zip(self.ordering[:index], values):
+                step &= Q(**{previous_field.lstrip('-'): value})
+            condition |= step
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = self.get_ordering(view)
+        self.cursor_fields = self.get_cursor_fields(queryset)
+        page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self.get_keyset_filter(self.decode_cursor(cursor)))
+
+        results = list(queryset[:page_size + 1])
+        self.has_next = len(results) > page_size
+        results = results[:page_size]
+
+        self.next_cursor = self.encode_cursor(self.get_keyset_values(results[-1])) if self.has_next else None
+        return results
+
+    def get_next_link(self):
+        url = self.request.build_absolute_uri()
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class BidirectionalKeysetPagination(KeysetPagination):
+    before_query_param = 'before'
+    after_query_param = 'after'
+    ordering = ('created_at', 'id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = self.get_ordering(view)
+        self.cursor_fields = self.get_cursor_fields(queryset)
+        page_size = self.get_page_size(request)
+        reversed_ordering = [field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering]
+
+        before = request.query_params.get(self.before_query_param)
+        after = request.query_params.get(self.after_query_param)
+
+        if after:
+            queryset = queryset.filter(self.get_keyset_filter(self.decode_cursor(after))).order_by(*self.ordering)
+            results = list(queryset[:page_size + 1])
+            self.has_next = len(results) > page_size
+            self.has_previous = True
+            results = results[:page_size]
+        else:
+            if before:
+                queryset = queryset.filter(self.get_keyset_filter(self.decode_cursor(before), reverse=True))
+            results = list(queryset.order_by(*reversed_ordering)[:page_size + 1])
+            self.has_previous = len(results) > page_size
+            self.has_next = bool(before)
+            results = results[:page_size][::-1]
+
+        self.set_cursors(results)
+        return results
+
+    def set_cursors(self, results):
+        self.previous_cursor = None
+        self.next_cursor = None
+        if results:
+            if self.has_previous:
+                self.previous_cursor = self.encode_cursor(self.get_keyset_values(results[0]))
+            if self.has_next:
+                self.next_cursor = self.encode_cursor(self.get_keyset_values(results[-1]))
+
+    def get_link(self, query_param, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.before_query_param)
+        url = remove_query_param(url, self.after_query_param)
+        return replace_query_param(url, query_param, cursor)
+
+    def get_next_link(self):
+        return self.get_link(self.after_query_param, self.next_cursor)
+
+    def get_previous_link(self):
+        return self.get_link(self.before_query_param, self.previous_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'previous': self.get_previous_link(),
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
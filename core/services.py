@@ -1,3 +1,5 @@
+import re
+from django.contrib.postgres.search import SearchQuery
 from django.db.models import QuerySet, Model
 from django.http import HttpRequest
 from typing import Optional, Type, Any, Dict, List, Callable
@@ -95,4 +97,16 @@ class QueryFilterService:
             from django.http import Http404
             raise Http404("No permission to access this object")
             
-        return obj 
\ No newline at end of file
+        return obj
+
+
+class FullTextSearchService:
+    @staticmethod
+    def build_query(text: str, config: str = 'simple', prefix: bool = True) -> Optional[SearchQuery]:
+        terms = re.findall(r'\w+', text or '')
+        if not terms:
+            return None
+
+        suffix = ':*' if prefix else ''
+        raw_query = ' & '.join(f"{term}{suffix}" for term in terms)
+        return SearchQuery(raw_query, search_type='raw', config=config)
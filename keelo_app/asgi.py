@@ -5,13 +5,15 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'keelo_app.settings')
 django.setup()
 
 from channels.routing import ProtocolTypeRouter, URLRouter
-from channels.auth import AuthMiddlewareStack
 from django.core.asgi import get_asgi_application
+from chat.lifespan import LifespanApp
+from chat.middleware import JWTAuthMiddlewareStack
 from chat.routing import websocket_urlpatterns
 
 application = ProtocolTypeRouter({
     "http": get_asgi_application(),
-    "websocket": AuthMiddlewareStack(
+    "websocket": JWTAuthMiddlewareStack(
         URLRouter(websocket_urlpatterns)
     ),
+    "lifespan": LifespanApp(),
 })
\ No newline at end of file
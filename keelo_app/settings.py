@@ -18,6 +18,7 @@ DJANGO_APPS= [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',    
+    'django.contrib.postgres',
 ]
 THIRD_PARTY_APPS = [
     'rest_framework',
@@ -149,6 +150,27 @@ DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL")
 CELERY_BROKER_URL = 'redis://redis:6379/0'
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
+CELERY_BEAT_SCHEDULE = {
+    'build-client-recommendations': {
+        'task': 'match.tasks.build_client_recommendations',
+        'schedule': 60 * 60,
+    },
+    'flush-user-presence': {
+        'task': 'users.tasks.flush_user_presence',
+        'schedule': 60,
+    },
+    'cleanup-stale-chat-uploads': {
+        'task': 'chat.tasks.cleanup_stale_uploads',
+        'schedule': 60 * 60,
+    },
+    'archive-chat-messages': {
+        'task': 'chat.tasks.archive_chat_messages',
+        'schedule': 24 * 60 * 60,
+    },
+}
+
+PRESENCE_TTL = 90
+PRESENCE_HEARTBEAT_INTERVAL = 30
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),     
@@ -169,10 +191,16 @@ CACHES = {
 
 CACHE_TTL = 60 * 60  
 
+SEARCH_CONFIG = 'simple'
+
 RATING_WEIGHT = 0.4
 EXPERIENCE_WEIGHT = 0.3
 REVIEW_COUNT_WEIGHT = 0.3
 
+RECOMMENDATION_LIMIT = 20
+RECOMMENDATION_CANDIDATES_PER_SPECIALIZATION = 200
+RECOMMENDATION_OVERLAP_BONUS = 5.0
+
 
 CHANNEL_LAYERS = {
     "default": {
@@ -183,6 +211,23 @@ CHANNEL_LAYERS = {
     },
 }
 
+CHAT_WRITE_BEHIND = False
+CHAT_WRITE_BEHIND_BATCH_SIZE = 100
+CHAT_WRITE_BEHIND_FLUSH_INTERVAL = 0.005
+CHAT_WRITE_BEHIND_MAX_PENDING = 5000
+CHAT_WRITE_BEHIND_DRAIN_TIMEOUT = 10
+CHAT_TYPING_THROTTLE = 3
+CHAT_INBOX_PREVIEW_LENGTH = 100
+CHAT_UPLOAD_TEMP_DIR = os.path.join(BASE_DIR, 'tmp', 'chat_uploads')
+CHAT_UPLOAD_CHUNK_SIZE = 5 * 1024 * 1024
+CHAT_UPLOAD_MAX_SIZE = 100 * 1024 * 1024
+CHAT_UPLOAD_EXPIRY = 24 * 60 * 60
+CHAT_THUMBNAIL_SIZE = (256, 256)
+CHAT_PREVIEW_SIZE = (1024, 1024)
+CHAT_ARCHIVE_ROOT = os.path.join(BASE_DIR, 'archive')
+CHAT_ARCHIVE_AFTER_DAYS = 365
+CHAT_ARCHIVE_SEGMENT_SIZE = 5000
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Dietitian Systems API',
     'DESCRIPTION': 'API documentation for Dietitian Systems',
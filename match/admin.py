@@ -1,6 +1,10 @@
 from django.contrib import admin
-from .models import MatchModel, Review, SpecializationChoice
+from .models import MatchModel, Review, SpecializationChoice, DietitianScore, DietitianSpecializationRank, DietitianRecommendation, DietitianCapacity
 
 admin.site.register(MatchModel)
 admin.site.register(Review)
 admin.site.register(SpecializationChoice)
+admin.site.register(DietitianScore)
+admin.site.register(DietitianSpecializationRank)
+admin.site.register(DietitianRecommendation)
+admin.site.register(DietitianCapacity)
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from match.services import DietitianScoringService
+from match.tasks import rescore_all_dietitians
+
+
+class Command(BaseCommand):
+    help = "Recompute the materialized dietitian scores and specialization ranks from reviews."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--async',
+            action='store_true',
+            dest='run_async',
+            help="Queue the rescoring job on Celery instead of running it inline."
+        )
+
+    def handle(self, *args, **options):
+        if options['run_async']:
+            result = rescore_all_dietitians.delay()
+            self.stdout.write(self.style.SUCCESS(f"Queued rescoring task {result.id}."))
+            return
+
+        result = DietitianScoringService.rebuild_scores()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt scores for {result['dietitians']} dietitians "
+            f"({result['specialization_ranks']} specialization ranks) in "
+            f"{result['query_seconds'] + result['compute_seconds'] + result['write_seconds']:.2f}s "
+            f"[query {result['query_seconds']:.2f}s, compute {result['compute_seconds']:.2f}s, "
+            f"write {result['write_seconds']:.2f}s]."
+        ))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from match.services import DietitianCapacityService
+
+
+class Command(BaseCommand):
+    help = "Recount pending and active matches for every dietitian's capacity counters."
+
+    def handle(self, *args, **options):
+        DietitianCapacityService.rebuild_counters()
+        self.stdout.write(self.style.SUCCESS("Rebuilt dietitian capacity counters."))
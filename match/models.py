@@ -60,5 +60,86 @@ class Review(BaseModel):
         return f"Review for {self.matching.dietitian.user.get_full_name()} by {self.matching.client.user.get_full_name()}" 
 
 
+class DietitianScore(models.Model):
+    dietitian = models.OneToOneField(
+        DietitianProfile,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='score'
+    )
+    rating_sum = models.PositiveIntegerField(default=0)
+    review_count = models.PositiveIntegerField(default=0)
+    average_rating = models.FloatField(default=0)
+    total_score = models.FloatField(default=0, db_index=True)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.dietitian.user.get_full_name()} - {self.total_score:.2f}"
+
+    @property
+    def rating_distribution(self):
+        return {rating: getattr(self, f'rating_{rating}_count') for rating in range(1, 6)}
+
+
+class DietitianSpecializationRank(models.Model):
+    dietitian = models.ForeignKey(DietitianProfile, on_delete=models.CASCADE, related_name='specialization_ranks')
+    specialization = models.ForeignKey(Specialization, on_delete=models.CASCADE, related_name='dietitian_ranks')
+    total_score = models.FloatField(default=0)
+    rank = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('dietitian', 'specialization')
+        ordering = ['specialization', 'rank']
+        indexes = [
+            models.Index(fields=['specialization', '-total_score', 'dietitian']),
+        ]
+
+    def __str__(self):
+        return f"{self.specialization.name} #{self.rank} - {self.dietitian.user.get_full_name()}"
+
 
+class DietitianRecommendation(models.Model):
+    client = models.ForeignKey(ClientProfile, on_delete=models.CASCADE, related_name='dietitian_recommendations')
+    dietitian = models.ForeignKey(DietitianProfile, on_delete=models.CASCADE, related_name='recommendations')
+    specialization = models.ForeignKey(Specialization, on_delete=models.CASCADE, related_name='recommendations')
+    score = models.FloatField(default=0)
+    rank = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('client', 'dietitian')
+        ordering = ['client', 'rank']
+        indexes = [
+            models.Index(fields=['client', 'rank']),
+        ]
+
+    def __str__(self):
+        return f"{self.client.user.get_full_name()} -> {self.dietitian.user.get_full_name()} (#{self.rank})"
+
+
+class DietitianCapacity(models.Model):
+    dietitian = models.OneToOneField(
+        DietitianProfile,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='capacity'
+    )
+    max_active_matches = models.PositiveIntegerField(default=30)
+    max_pending_matches = models.PositiveIntegerField(default=10)
+    active_count = models.PositiveIntegerField(default=0)
+    pending_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'Dietitian Capacities'
+
+    def __str__(self):
+        return f"{self.dietitian.user.get_full_name()} - {self.active_count}/{self.max_active_matches} active, {self.pending_count}/{self.max_pending_matches} pending"
 
+    @property
+    def is_saturated(self):
+        return self.active_count >= self.max_active_matches or self.pending_count >= self.max_pending_matches
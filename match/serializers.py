@@ -2,7 +2,6 @@ from rest_framework import serializers
 from .models import MatchModel, Review, SpecializationChoice
 from users.serializers import  SpecializationSerializer
 from users.models import DietitianProfile, ClientProfile, Specialization
-from django.db.models import Avg
 from core.enums import MatchingStatus, ReviewStatus
 from .services import MatchingService, ReviewService
 from django.contrib.auth import get_user_model
@@ -36,9 +35,10 @@ class SimpleMatchingSerializer(serializers.ModelSerializer):
         fields = ['id', 'dietitian']
 
 class DietitianScoreSerializer(serializers.ModelSerializer):
-    average_rating = serializers.SerializerMethodField()
-    review_count = serializers.SerializerMethodField()
-    total_score = serializers.SerializerMethodField()
+    average_rating = serializers.FloatField(read_only=True)
+    review_count = serializers.IntegerField(read_only=True)
+    total_score = serializers.FloatField(read_only=True)
+    rank = serializers.IntegerField(read_only=True)
     first_name = serializers.CharField(source='user.first_name', read_only=True)
     last_name = serializers.CharField(source='user.last_name', read_only=True)
     city = serializers.CharField( read_only=True)
@@ -49,28 +49,14 @@ class DietitianScoreSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'first_name', 'last_name', 'city', 'profile_picture',
             'specializations', 'experience_years',
-            'average_rating', 'review_count', 'total_score'
+            'average_rating', 'review_count', 'total_score', 'rank'
         ]
 
-    def get_average_rating(self, obj):
-        return Review.objects.filter(matching__dietitian=obj).aggregate(avg=Avg('rating'))['avg'] or 0
+class DietitianReviewStatisticsSerializer(serializers.Serializer):
+    average_rating = serializers.FloatField()
+    rating_count = serializers.IntegerField()
+    rating_distribution = serializers.DictField(child=serializers.IntegerField())
 
-    def get_review_count(self, obj):
-        return Review.objects.filter(matching__dietitian=obj).count()
-
-    def get_total_score(self, obj):
-        avg_rating = self.get_average_rating(obj)
-        experience_years = obj.experience_years or 0
-        review_count = self.get_review_count(obj)
-
-        normalized_experience = min(experience_years / 30, 1)
-        normalized_reviews = min(review_count / 100, 1)
-
-        return (
-            (avg_rating / 5) * 0.4 +
-            normalized_experience * 0.3 +
-            normalized_reviews * 0.3
-        ) * 100
 
 class SpecializationChoiceSerializer(serializers.ModelSerializer):
     specialization = SpecializationSerializer(read_only=True)
@@ -125,6 +111,16 @@ class MatchingUpdateSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         return MatchingService.update_matching_status(instance, validated_data['status'])
 
+class MatchingBulkStatusUpdateSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=500
+    )
+    status = serializers.ChoiceField(
+        choices=[MatchingStatus.ACCEPTED, MatchingStatus.REJECTED, MatchingStatus.ENDED]
+    )
+
 class ReviewSerializer(serializers.ModelSerializer):
     matching = SimpleMatchingSerializer(read_only=True)
     matching_id = serializers.PrimaryKeyRelatedField(
@@ -170,8 +166,7 @@ class ReviewStatusUpdateSerializer(serializers.ModelSerializer):
         old_status = instance.status  
         new_status = validated_data.get('status', instance.status)
 
-        instance.status = new_status
-        instance.save()
+        ReviewService.update_status(instance, new_status)
 
         if old_status != ReviewStatus.ACCEPTED and new_status == ReviewStatus.ACCEPTED:
             NotificationService.send_review_notification(instance)
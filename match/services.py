@@ -1,12 +1,28 @@
-from .models import MatchModel, Review, SpecializationChoice
-from users.models import  DietitianProfile
-from core.enums import MatchingStatus
+import heapq
+import time
+import numpy as np
+import pandas as pd
+from collections import defaultdict
+from .models import (
+    MatchModel,
+    Review,
+    SpecializationChoice,
+    DietitianScore,
+    DietitianSpecializationRank,
+    DietitianRecommendation,
+    DietitianCapacity,
+)
+from users.models import  DietitianProfile, ClientProfile, Specialization
+from core.enums import MatchingStatus, ReviewStatus
 from django.utils import timezone
 from rest_framework import exceptions
-from django.db.models import Avg, Count
+from django.db import transaction
+from django.db.models import Count, Sum, Q, F, Value
+from django.db.models.functions import Coalesce, Greatest
 from django.conf import settings
-from django.core.cache import cache
+from django.contrib.postgres.search import SearchVector
 from notifications.services import NotificationService  
+from core.services import FullTextSearchService
 
 class SpecializationChoiceService:
     @staticmethod
@@ -14,66 +30,482 @@ class SpecializationChoiceService:
         if SpecializationChoice.objects.filter(client=client, specialization=specialization).exists():
             raise exceptions.ValidationError("You have already chosen this specialization.")
         
-        return SpecializationChoice.objects.create(
+        choice = SpecializationChoice.objects.create(
             client=client,
             specialization=specialization
         )
 
+        from .tasks import build_client_recommendations
+        transaction.on_commit(lambda: build_client_recommendations.delay([client.id]))
+        return choice
+
     @staticmethod
     def get_client_choices(client):
         return SpecializationChoice.objects.filter(client=client)
 
 
 class DietitianScoringService:
+    RATINGS = range(1, 6)
+
+    @staticmethod
+    def compute_total_score(average_rating, experience_years, review_count):
+        normalized_experience = min((experience_years or 0) / 30, 1)
+        normalized_reviews = min(review_count / 100, 1)
+
+        return (
+            (average_rating / 5) * settings.RATING_WEIGHT +
+            normalized_experience * settings.EXPERIENCE_WEIGHT +
+            normalized_reviews * settings.REVIEW_COUNT_WEIGHT
+        ) * 100
+
     @staticmethod
+    def get_review_statistics(dietitian):
+        score = DietitianScore.objects.filter(dietitian=dietitian).first()
+        if score is None:
+            score = DietitianScoringService.refresh_dietitian_score(dietitian)
 
-    def calculate_dietitian_score(dietitian):
-        cache_key = f'dietitian_score_{dietitian.id}'
-        cached_score = cache.get(cache_key)
-        if cached_score:
-            return cached_score
-
-        rating_weight = settings.RATING_WEIGHT
-        experience_weight = settings.EXPERIENCE_WEIGHT
-        review_count_weight = settings.REVIEW_COUNT_WEIGHT
-
-        avg_rating = Review.objects.filter(matching__dietitian=dietitian).aggregate(Avg('rating'))['rating__avg'] or 0
-        experience_years = dietitian.experience_years or 0
-        review_count = Review.objects.filter(matching__dietitian=dietitian).count()
-
-        normalized_experience = min(experience_years / 30, 1)  
-        normalized_reviews = min(review_count / 100, 1)        
-
-        score = {
-            'average_rating': avg_rating,
-            'experience_years': experience_years,
-            'review_count': review_count,
-            'total_score': (
-                (avg_rating / 5) * rating_weight +
-                normalized_experience * experience_weight +
-                normalized_reviews * review_count_weight
-            ) * 100
+        return {
+            'average_rating': score.average_rating,
+            'rating_count': score.review_count,
+            'rating_distribution': score.rating_distribution,
         }
 
-        cache.set(cache_key, score, timeout=settings.CACHE_TTL)
+    @staticmethod
+    def get_dietitians_by_specialization_queryset(specialization, search=None):
+        dietitians = DietitianProfile.objects.filter(
+            specialization_ranks__specialization=specialization
+        ).select_related('user').prefetch_related('specializations').annotate(
+            total_score=F('specialization_ranks__total_score'),
+            rank=F('specialization_ranks__rank'),
+            average_rating=Coalesce(F('score__average_rating'), Value(0.0)),
+            review_count=Coalesce(F('score__review_count'), Value(0)),
+        ).filter(DietitianCapacityService.available_filter())
+
+        search_query = FullTextSearchService.build_query(search, config=settings.SEARCH_CONFIG)
+        if search_query is not None:
+            dietitians = dietitians.annotate(
+                search=SearchVector('user__first_name', 'user__last_name', 'city', config=settings.SEARCH_CONFIG)
+            ).filter(search=search_query)
+
+        return dietitians.order_by('-total_score', 'id')
+
+    @staticmethod
+    @transaction.atomic
+    def refresh_dietitian_score(dietitian):
+        totals = Review.objects.filter(matching__dietitian=dietitian, status=ReviewStatus.ACCEPTED).aggregate(
+            rating_sum=Sum('rating'),
+            review_count=Count('id'),
+            **{
+                f'rating_{rating}_count': Count('id', filter=Q(rating=rating))
+                for rating in DietitianScoringService.RATINGS
+            }
+        )
+
+        score, _ = DietitianScore.objects.select_for_update().get_or_create(dietitian=dietitian)
+        score.rating_sum = totals['rating_sum'] or 0
+        score.review_count = totals['review_count']
+        for rating in DietitianScoringService.RATINGS:
+            setattr(score, f'rating_{rating}_count', totals[f'rating_{rating}_count'])
+        DietitianScoringService._save_score(score, dietitian)
         return score
 
     @staticmethod
-    def get_dietitians_by_specialization_queryset(specialization):
-        dietitians = DietitianProfile.objects.filter(specializations=specialization)
-        scored_dietitians = []
-        
-        for dietitian in dietitians:
-            score = DietitianScoringService.calculate_dietitian_score(dietitian)
-            scored_dietitians.append({
-                'dietitian': dietitian,
-                'score': score
-            })
-        
-        return sorted(scored_dietitians, key=lambda x: x['score']['total_score'], reverse=True)
+    @transaction.atomic
+    def apply_review_change(dietitian, old_rating=None, new_rating=None):
+        if old_rating == new_rating:
+            return None
+
+        try:
+            score = DietitianScore.objects.select_for_update().get(dietitian=dietitian)
+        except DietitianScore.DoesNotExist:
+            return DietitianScoringService.refresh_dietitian_score(dietitian)
+
+        if old_rating is not None:
+            score.rating_sum -= old_rating
+            score.review_count -= 1
+            setattr(score, f'rating_{old_rating}_count', getattr(score, f'rating_{old_rating}_count') - 1)
+        if new_rating is not None:
+            score.rating_sum += new_rating
+            score.review_count += 1
+            setattr(score, f'rating_{new_rating}_count', getattr(score, f'rating_{new_rating}_count') + 1)
+
+        DietitianScoringService._save_score(score, dietitian)
+        return score
+
+    @staticmethod
+    def _save_score(score, dietitian):
+        old_total_score = score.total_score
+
+        score.average_rating = score.rating_sum / score.review_count if score.review_count else 0
+        score.total_score = DietitianScoringService.compute_total_score(
+            score.average_rating, dietitian.experience_years, score.review_count
+        )
+        score.save()
+
+        if score.total_score != old_total_score:
+            ranks = DietitianSpecializationRank.objects.filter(dietitian=dietitian)
+            specialization_ids = DietitianScoringService.lock_specializations(
+                ranks.values_list('specialization_id', flat=True)
+            )
+            ranks.update(total_score=score.total_score)
+
+            low, high = sorted([old_total_score, score.total_score])
+            for specialization_id in specialization_ids:
+                DietitianScoringService.rerank_specialization(specialization_id, low, high)
+
+    @staticmethod
+    def lock_specializations(specialization_ids):
+        return list(
+            Specialization.objects.select_for_update().filter(
+                id__in=list(specialization_ids)
+            ).order_by('id').values_list('id', flat=True)
+        )
+
+    @staticmethod
+    @transaction.atomic
+    def sync_specialization_ranks(dietitian):
+        score = DietitianScore.objects.filter(dietitian=dietitian).first()
+        if score is None:
+            score = DietitianScoringService.refresh_dietitian_score(dietitian)
+
+        specialization_ids = set(dietitian.specializations.values_list('id', flat=True))
+        ranks = DietitianSpecializationRank.objects.filter(dietitian=dietitian)
+        existing_ids = set(ranks.values_list('specialization_id', flat=True))
+        DietitianScoringService.lock_specializations(specialization_ids | existing_ids)
+
+        ranks.exclude(specialization_id__in=specialization_ids).delete()
+        DietitianSpecializationRank.objects.bulk_create([
+            DietitianSpecializationRank(
+                dietitian=dietitian,
+                specialization_id=specialization_id,
+                total_score=score.total_score
+            )
+            for specialization_id in specialization_ids - existing_ids
+        ])
+
+        for specialization_id in specialization_ids ^ existing_ids:
+            DietitianScoringService.rerank_specialization(specialization_id)
+
+    @staticmethod
+    @transaction.atomic
+    def rerank_specialization(specialization_id, low=None, high=None):
+        DietitianScoringService.lock_specializations([specialization_id])
+        ranks = DietitianSpecializationRank.objects.filter(specialization_id=specialization_id)
+        start = 1
+
+        if low is not None and high is not None:
+            start += ranks.filter(total_score__gt=high).count()
+            ranks = ranks.filter(total_score__gte=low, total_score__lte=high)
+
+        changed = []
+        for position, rank in enumerate(
+            ranks.order_by('-total_score', 'dietitian_id').only('id', 'rank'),
+            start=start
+        ):
+            if rank.rank != position:
+                rank.rank = position
+                changed.append(rank)
+
+        DietitianSpecializationRank.objects.bulk_update(changed, ['rank'])
+
+    @staticmethod
+    @transaction.atomic
+    def rebuild_scores():
+        timings = {}
+        started = time.perf_counter()
+
+        review_filter = Q(
+            dietitian_matchings__review__is_deleted=False,
+            dietitian_matchings__review__status=ReviewStatus.ACCEPTED
+        )
+        histogram_fields = [f'rating_{rating}_count' for rating in DietitianScoringService.RATINGS]
+        scores = pd.DataFrame.from_records(
+            DietitianProfile.objects.annotate(
+                rating_sum=Coalesce(Sum('dietitian_matchings__review__rating', filter=review_filter), Value(0)),
+                review_count=Count('dietitian_matchings__review', filter=review_filter, distinct=True),
+                **{
+                    f'rating_{rating}_count': Count(
+                        'dietitian_matchings__review',
+                        filter=review_filter & Q(dietitian_matchings__review__rating=rating),
+                        distinct=True
+                    )
+                    for rating in DietitianScoringService.RATINGS
+                }
+            ).values_list('id', 'experience_years', 'rating_sum', 'review_count', *histogram_fields),
+            columns=['dietitian_id', 'experience_years', 'rating_sum', 'review_count', *histogram_fields]
+        )
+        memberships = pd.DataFrame.from_records(
+            DietitianProfile.specializations.through.objects.values_list('dietitianprofile_id', 'specialization_id'),
+            columns=['dietitian_id', 'specialization_id']
+        )
+        timings['query_seconds'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        review_counts = scores['review_count'].to_numpy(dtype=float)
+        average_ratings = np.divide(
+            scores['rating_sum'].to_numpy(dtype=float),
+            review_counts,
+            out=np.zeros(len(scores)),
+            where=review_counts > 0
+        )
+        scores['average_rating'] = average_ratings
+        scores['total_score'] = (
+            average_ratings / 5 * settings.RATING_WEIGHT +
+            np.minimum(scores['experience_years'].to_numpy(dtype=float) / 30, 1) * settings.EXPERIENCE_WEIGHT +
+            np.minimum(review_counts / 100, 1) * settings.REVIEW_COUNT_WEIGHT
+        ) * 100
+
+        ranks = memberships.merge(scores[['dietitian_id', 'total_score']], on='dietitian_id')
+        ranks = ranks.sort_values(
+            ['specialization_id', 'total_score', 'dietitian_id'],
+            ascending=[True, False, True]
+        )
+        ranks['rank'] = ranks.groupby('specialization_id').cumcount() + 1
+        timings['compute_seconds'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        DietitianScore.objects.bulk_create(
+            [
+                DietitianScore(
+                    dietitian_id=int(row.dietitian_id),
+                    rating_sum=int(row.rating_sum),
+                    review_count=int(row.review_count),
+                    average_rating=float(row.average_rating),
+                    total_score=float(row.total_score),
+                    **{field: int(getattr(row, field)) for field in histogram_fields}
+                )
+                for row in scores.itertuples(index=False)
+            ],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['dietitian'],
+            update_fields=['rating_sum', 'review_count', 'average_rating', 'total_score', *histogram_fields, 'updated_at']
+        )
+
+        DietitianScoringService.lock_specializations(Specialization.objects.values_list('id', flat=True))
+        DietitianSpecializationRank.objects.all().delete()
+        DietitianSpecializationRank.objects.bulk_create(
+            [
+                DietitianSpecializationRank(
+                    dietitian_id=int(row.dietitian_id),
+                    specialization_id=int(row.specialization_id),
+                    total_score=float(row.total_score),
+                    rank=int(row.rank)
+                )
+                for row in ranks.itertuples(index=False)
+            ],
+            batch_size=1000
+        )
+
+        timings['write_seconds'] = time.perf_counter() - started
+
+        return {
+            'dietitians': len(scores),
+            'specialization_ranks': len(ranks),
+            **timings,
+        }
+
+class DietitianRecommendationService:
+    CHUNK_SIZE = 500
+
+    @staticmethod
+    def get_recommended_dietitians_queryset(client):
+        return DietitianProfile.objects.filter(
+            recommendations__client=client
+        ).select_related('user').prefetch_related('specializations').annotate(
+            total_score=Coalesce(F('score__total_score'), Value(0.0)),
+            rank=F('recommendations__rank'),
+            average_rating=Coalesce(F('score__average_rating'), Value(0.0)),
+            review_count=Coalesce(F('score__review_count'), Value(0)),
+        ).order_by('rank')
+
+    @staticmethod
+    def build_recommendations(client_ids=None):
+        clients = ClientProfile.objects.filter(specialization_choices__isnull=False).distinct()
+        if client_ids is not None:
+            clients = clients.filter(id__in=client_ids)
+        client_ids = list(clients.values_list('id', flat=True))
+
+        for start in range(0, len(client_ids), DietitianRecommendationService.CHUNK_SIZE):
+            DietitianRecommendationService._build_chunk(
+                client_ids[start:start + DietitianRecommendationService.CHUNK_SIZE]
+            )
+        return len(client_ids)
+
+    @staticmethod
+    @transaction.atomic
+    def _build_chunk(client_ids):
+        client_specializations = defaultdict(set)
+        for client_id, specialization_id in SpecializationChoice.objects.filter(
+            client_id__in=client_ids
+        ).values_list('client_id', 'specialization_id'):
+            client_specializations[client_id].add(specialization_id)
+
+        specialization_ids = set().union(*client_specializations.values())
+        candidates = defaultdict(list)
+        for specialization_id, dietitian_id, total_score, consultation_fee in DietitianSpecializationRank.objects.filter(
+            specialization_id__in=specialization_ids,
+            rank__lte=settings.RECOMMENDATION_CANDIDATES_PER_SPECIALIZATION
+        ).filter(
+            DietitianCapacityService.available_filter('dietitian__capacity')
+        ).values_list('specialization_id', 'dietitian_id', 'total_score', 'dietitian__consultation_fee'):
+            candidates[specialization_id].append((dietitian_id, total_score, consultation_fee))
+
+        excluded = defaultdict(set)
+        for client_id, dietitian_id in MatchModel.objects.filter(
+            client_id__in=client_ids,
+            status__in=[MatchingStatus.PENDING, MatchingStatus.ACCEPTED]
+        ).values_list('client_id', 'dietitian_id'):
+            excluded[client_id].add(dietitian_id)
+
+        recommendations = []
+        for client_id in client_ids:
+            best = {}
+            overlaps = defaultdict(int)
+            for specialization_id in client_specializations[client_id]:
+                for dietitian_id, total_score, consultation_fee in candidates[specialization_id]:
+                    if dietitian_id in excluded[client_id]:
+                        continue
+                    overlaps[dietitian_id] += 1
+                    if dietitian_id not in best or total_score > best[dietitian_id][0]:
+                        best[dietitian_id] = (total_score, consultation_fee, specialization_id)
+
+            ranked = heapq.nsmallest(
+                settings.RECOMMENDATION_LIMIT,
+                (
+                    (
+                        -(total_score + settings.RECOMMENDATION_OVERLAP_BONUS * (overlaps[dietitian_id] - 1)),
+                        consultation_fee,
+                        dietitian_id,
+                        specialization_id,
+                    )
+                    for dietitian_id, (total_score, consultation_fee, specialization_id) in best.items()
+                )
+            )
+            recommendations.extend(
+                DietitianRecommendation(
+                    client_id=client_id,
+                    dietitian_id=dietitian_id,
+                    specialization_id=specialization_id,
+                    score=-negative_score,
+                    rank=position
+                )
+                for position, (negative_score, _, dietitian_id, specialization_id) in enumerate(ranked, start=1)
+            )
+
+        DietitianRecommendation.objects.filter(client_id__in=client_ids).delete()
+        DietitianRecommendation.objects.bulk_create(recommendations)
+
+class DietitianCapacityService:
+    STATUS_COUNTERS = {
+        MatchingStatus.PENDING: 'pending_count',
+        MatchingStatus.ACCEPTED: 'active_count',
+    }
+
+    @staticmethod
+    def available_filter(prefix='capacity'):
+        return Q(**{f'{prefix}__isnull': True}) | Q(**{
+            f'{prefix}__active_count__lt': F(f'{prefix}__max_active_matches'),
+            f'{prefix}__pending_count__lt': F(f'{prefix}__max_pending_matches'),
+        })
+
+    @staticmethod
+    def ensure_capacity(dietitian_ids):
+        existing_ids = set(DietitianCapacity.objects.filter(
+            dietitian_id__in=dietitian_ids
+        ).values_list('dietitian_id', flat=True))
+        missing_ids = set(dietitian_ids) - existing_ids
+        if not missing_ids:
+            return
+
+        counts = MatchModel.objects.filter(dietitian_id__in=missing_ids).values('dietitian_id').annotate(
+            pending_count=Count('id', filter=Q(status=MatchingStatus.PENDING)),
+            active_count=Count('id', filter=Q(status=MatchingStatus.ACCEPTED)),
+        )
+        counts = {row['dietitian_id']: row for row in counts}
+
+        DietitianCapacity.objects.bulk_create([
+            DietitianCapacity(
+                dietitian_id=dietitian_id,
+                pending_count=counts.get(dietitian_id, {}).get('pending_count', 0),
+                active_count=counts.get(dietitian_id, {}).get('active_count', 0),
+            )
+            for dietitian_id in missing_ids
+        ], ignore_conflicts=True)
+
+    @staticmethod
+    def get_deltas(old_status, new_status):
+        deltas = {'pending_count': 0, 'active_count': 0}
+        if old_status in DietitianCapacityService.STATUS_COUNTERS:
+            deltas[DietitianCapacityService.STATUS_COUNTERS[old_status]] -= 1
+        if new_status in DietitianCapacityService.STATUS_COUNTERS:
+            deltas[DietitianCapacityService.STATUS_COUNTERS[new_status]] += 1
+        return deltas
+
+    @staticmethod
+    def adjust_counters(dietitian_id, pending_delta=0, active_delta=0):
+        if not pending_delta and not active_delta:
+            return
+
+        DietitianCapacityService.ensure_capacity([dietitian_id])
+
+        capacity = DietitianCapacity.objects.filter(dietitian_id=dietitian_id)
+        if pending_delta > 0:
+            capacity = capacity.filter(pending_count__lte=F('max_pending_matches') - pending_delta)
+        if active_delta > 0:
+            capacity = capacity.filter(active_count__lte=F('max_active_matches') - active_delta)
+
+        updated = capacity.update(
+            pending_count=Greatest(F('pending_count') + pending_delta, 0),
+            active_count=Greatest(F('active_count') + active_delta, 0),
+        )
+        if not updated:
+            if pending_delta > 0:
+                raise exceptions.ValidationError("This dietitian is not accepting new match requests right now.")
+            raise exceptions.ValidationError("This dietitian has reached the maximum number of active clients.")
+
+    @staticmethod
+    def apply_transition(dietitian_id, old_status, new_status):
+        deltas = DietitianCapacityService.get_deltas(old_status, new_status)
+        DietitianCapacityService.adjust_counters(
+            dietitian_id,
+            pending_delta=deltas['pending_count'],
+            active_delta=deltas['active_count']
+        )
+
+    @staticmethod
+    @transaction.atomic
+    def rebuild_counters():
+        counts = MatchModel.objects.values('dietitian_id').annotate(
+            pending_count=Count('id', filter=Q(status=MatchingStatus.PENDING)),
+            active_count=Count('id', filter=Q(status=MatchingStatus.ACCEPTED)),
+        )
+        counts = {row['dietitian_id']: row for row in counts}
+
+        DietitianCapacity.objects.bulk_create(
+            [
+                DietitianCapacity(
+                    dietitian_id=dietitian_id,
+                    pending_count=counts.get(dietitian_id, {}).get('pending_count', 0),
+                    active_count=counts.get(dietitian_id, {}).get('active_count', 0),
+                )
+                for dietitian_id in DietitianProfile.objects.values_list('id', flat=True)
+            ],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['dietitian'],
+            update_fields=['pending_count', 'active_count']
+        )
 
 class MatchingService:
+    BULK_TRANSITIONS = {
+        MatchingStatus.ACCEPTED: [MatchingStatus.PENDING],
+        MatchingStatus.REJECTED: [MatchingStatus.PENDING],
+        MatchingStatus.ENDED: [MatchingStatus.PENDING, MatchingStatus.ACCEPTED],
+    }
+
     @staticmethod
+    @transaction.atomic
     def create_matching(client, dietitian, specialization):
         if not dietitian.specializations.filter(id=specialization.id).exists():
             raise exceptions.ValidationError("This dietitian is not in your chosen specialty.")
@@ -84,6 +516,8 @@ class MatchingService:
             specialization=specialization
         ).exists():
             raise exceptions.ValidationError("This match already exists.")
+
+        DietitianCapacityService.apply_transition(dietitian.id, None, MatchingStatus.PENDING)
         
         return MatchModel.objects.create(
             client=client,
@@ -93,6 +527,7 @@ class MatchingService:
         )
 
     @staticmethod
+    @transaction.atomic
     def update_matching_status(matching, status, user):
         if status not in [MatchingStatus.ACCEPTED, MatchingStatus.REJECTED, MatchingStatus.ENDED]:
             raise exceptions.ValidationError("Invalid status.")
@@ -108,6 +543,8 @@ class MatchingService:
             if user != matching.client.user and user != matching.dietitian.user and not user.is_staff:
                 raise exceptions.PermissionDenied("You are not authorized to perform this operation.")
             matching.ended_at = timezone.now()
+
+        DietitianCapacityService.apply_transition(matching.dietitian_id, old_status, status)
         
         matching.status = status
         matching.save()
@@ -116,16 +553,80 @@ class MatchingService:
         
         return matching
 
+    @staticmethod
+    @transaction.atomic
+    def bulk_update_matching_status(matching_ids, status, user):
+        allowed_statuses = MatchingService.BULK_TRANSITIONS.get(status)
+        if allowed_statuses is None:
+            raise exceptions.ValidationError("Invalid status.")
+
+        matching_ids = set(matching_ids)
+        matchings = MatchModel.objects.select_for_update(of=('self',)).select_related(
+            'client__user', 'dietitian__user'
+        ).filter(id__in=matching_ids, status__in=allowed_statuses)
+
+        if not user.is_staff:
+            allowed_users = Q(dietitian__user=user)
+            if status == MatchingStatus.ENDED:
+                allowed_users |= Q(client__user=user)
+            matchings = matchings.filter(allowed_users)
+
+        matchings = list(matchings)
+        invalid_ids = matching_ids - {matching.id for matching in matchings}
+        if invalid_ids:
+            raise exceptions.ValidationError({
+                'ids': f"These matches cannot be updated to the requested status: {sorted(invalid_ids)}"
+            })
+
+        deltas = defaultdict(lambda: {'pending_count': 0, 'active_count': 0})
+        for matching in matchings:
+            for counter, delta in DietitianCapacityService.get_deltas(matching.status, status).items():
+                deltas[matching.dietitian_id][counter] += delta
+        for dietitian_id, dietitian_deltas in deltas.items():
+            DietitianCapacityService.adjust_counters(
+                dietitian_id,
+                pending_delta=dietitian_deltas['pending_count'],
+                active_delta=dietitian_deltas['active_count']
+            )
+
+        now = timezone.now()
+        fields = {'status': status, 'updated_at': now}
+        if status == MatchingStatus.ACCEPTED:
+            fields['matched_at'] = now
+        elif status == MatchingStatus.ENDED:
+            fields['ended_at'] = now
+        MatchModel.objects.filter(id__in=matching_ids).update(**fields)
+
+        for matching in matchings:
+            for field, value in fields.items():
+                setattr(matching, field, value)
+
+        NotificationService.send_bulk_matching_status_notifications(matchings, status)
+        return matchings
+
+    @staticmethod
+    @transaction.atomic
+    def delete_matching(matching):
+        DietitianCapacityService.apply_transition(matching.dietitian_id, matching.status, None)
+        matching.delete()
+
+    @staticmethod
+    def with_related(queryset):
+        return queryset.select_related(
+            'client__user', 'dietitian__user', 'specialization'
+        ).prefetch_related('dietitian__specializations')
+
     @staticmethod
     def get_client_matchings(client):
-        return MatchModel.objects.filter(client=client)
+        return MatchingService.with_related(MatchModel.objects.filter(client=client))
 
     @staticmethod
     def get_dietitian_matchings(dietitian):
-        return  MatchModel.objects.filter(dietitian=dietitian)
+        return MatchingService.with_related(MatchModel.objects.filter(dietitian=dietitian))
 
 class ReviewService:
     @staticmethod
+    @transaction.atomic
     def create_review(matching, rating, comment, user):
         if matching.client.user != user:
             raise exceptions.PermissionDenied("You can only comment to your own dietitian.")
@@ -139,22 +640,73 @@ class ReviewService:
             deleted_review.rating = rating
             deleted_review.comment = comment
             deleted_review.save()
+            if deleted_review.status == ReviewStatus.ACCEPTED:
+                DietitianScoringService.apply_review_change(matching.dietitian, new_rating=rating)
             return deleted_review
 
         if Review.objects.filter(matching=matching, is_deleted=False).exists():
             raise exceptions.ValidationError("You have already commented on this dietitian.")
         
-        return Review.objects.create(
+        review = Review.objects.create(
             matching=matching,
             rating=rating,
             comment=comment
         )
-        
+        return review
+
+    @staticmethod
+    @transaction.atomic
+    def update_review(review, **data):
+        old_dietitian = review.matching.dietitian
+        old_rating = ReviewService.scored_rating(review)
+
+        for key, value in data.items():
+            setattr(review, key, value)
+        review.save()
+
+        new_dietitian = review.matching.dietitian
+        new_rating = ReviewService.scored_rating(review)
+        if new_dietitian.id == old_dietitian.id:
+            DietitianScoringService.apply_review_change(new_dietitian, old_rating, new_rating)
+        else:
+            DietitianScoringService.apply_review_change(old_dietitian, old_rating=old_rating)
+            DietitianScoringService.apply_review_change(new_dietitian, new_rating=new_rating)
+        return review
+
+    @staticmethod
+    @transaction.atomic
+    def update_status(review, status):
+        old_rating = ReviewService.scored_rating(review)
+        review.status = status
+        review.save()
+        DietitianScoringService.apply_review_change(
+            review.matching.dietitian, old_rating, ReviewService.scored_rating(review)
+        )
+        return review
+
+    @staticmethod
+    @transaction.atomic
+    def delete_review(review):
+        old_rating = ReviewService.scored_rating(review)
+        review.delete()
+        DietitianScoringService.apply_review_change(review.matching.dietitian, old_rating=old_rating)
+
+    @staticmethod
+    def scored_rating(review):
+        if review.is_deleted or review.status != ReviewStatus.ACCEPTED:
+            return None
+        return review.rating
+
+    @staticmethod
+    def with_related(queryset):
+        return queryset.select_related('matching__dietitian__user').prefetch_related(
+            'matching__dietitian__specializations'
+        )
 
     @staticmethod
     def get_dietitian_reviews(dietitian):
-        return Review.objects.filter(matching__dietitian=dietitian)
+        return ReviewService.with_related(Review.objects.filter(matching__dietitian=dietitian))
 
     @staticmethod
     def get_client_reviews(client):
-        return Review.objects.filter(matching__client=client) 
+        return ReviewService.with_related(Review.objects.filter(matching__client=client))
@@ -0,0 +1,29 @@
+from django.db.models.signals import post_save, m2m_changed
+from django.dispatch import receiver
+from users.models import DietitianProfile
+from .models import DietitianSpecializationRank, DietitianCapacity
+from .services import DietitianScoringService
+
+
+@receiver(post_save, sender=DietitianProfile)
+def dietitian_profile_saved(sender, instance, created, **kwargs):
+    DietitianScoringService.refresh_dietitian_score(instance)
+    if created:
+        DietitianCapacity.objects.get_or_create(dietitian=instance)
+
+
+@receiver(m2m_changed, sender=DietitianProfile.specializations.through)
+def dietitian_specializations_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        DietitianScoringService.sync_specialization_ranks(instance)
+        return
+
+    if action == 'post_clear':
+        DietitianSpecializationRank.objects.filter(specialization=instance).delete()
+        return
+
+    for dietitian in DietitianProfile.objects.filter(id__in=pk_set):
+        DietitianScoringService.sync_specialization_ranks(dietitian)
@@ -0,0 +1,12 @@
+from celery import shared_task
+from .services import DietitianRecommendationService, DietitianScoringService
+
+
+@shared_task
+def build_client_recommendations(client_ids=None):
+    return DietitianRecommendationService.build_recommendations(client_ids)
+
+
+@shared_task
+def rescore_all_dietitians():
+    return DietitianScoringService.rebuild_scores()
@@ -1,3 +1,205 @@
-from django.test import TestCase
+import base64
+import json
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from core.enums import UserType, MatchingStatus, ReviewStatus
+from users.models import User, Specialization, DietitianProfile, ClientProfile
+from .models import MatchModel, Review, DietitianScore, DietitianSpecializationRank
+from .services import DietitianScoringService
 
-# Create your tests here.
+
+class ListEndpointQueryCountTests(APITestCase):
+    MATCHING_LIST_QUERIES = 4
+    REVIEW_LIST_QUERIES = 4
+
+    def setUp(self):
+        self.specialization = Specialization.objects.create(code='weight-loss', name='Weight Loss')
+        self.dietitian_user = User.objects.create_user(
+            email='dietitian@example.com',
+            password='password',
+            user_type=UserType.DIETITIAN
+        )
+        self.dietitian = DietitianProfile.objects.create(user=self.dietitian_user)
+        self.dietitian.specializations.add(self.specialization)
+        self.client_number = 0
+
+    def create_reviewed_matchings(self, count):
+        for _ in range(count):
+            self.client_number += 1
+            user = User.objects.create_user(
+                email=f'client{self.client_number}@example.com',
+                password='password',
+                user_type=UserType.CLIENT
+            )
+            client_profile = ClientProfile.objects.create(user=user)
+            matching = MatchModel.objects.create(
+                client=client_profile,
+                dietitian=self.dietitian,
+                specialization=self.specialization,
+                status=MatchingStatus.ACCEPTED
+            )
+            Review.objects.create(matching=matching, rating=5, status=ReviewStatus.ACCEPTED)
+
+    def assert_list_queries(self, url, user, expected_queries, expected_count):
+        self.client.force_authenticate(User.objects.get(pk=user.pk))
+        with self.assertNumQueries(expected_queries):
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], expected_count)
+
+    def test_matching_list_query_count_does_not_grow(self):
+        url = reverse('matching-list-create')
+
+        self.create_reviewed_matchings(2)
+        self.assert_list_queries(url, self.dietitian_user, self.MATCHING_LIST_QUERIES, 2)
+
+        self.create_reviewed_matchings(10)
+        self.assert_list_queries(url, self.dietitian_user, self.MATCHING_LIST_QUERIES, 12)
+
+    def test_review_list_query_count_does_not_grow(self):
+        url = reverse('review-list-create')
+
+        self.create_reviewed_matchings(2)
+        self.assert_list_queries(url, self.dietitian_user, self.REVIEW_LIST_QUERIES, 2)
+
+        self.create_reviewed_matchings(10)
+        self.assert_list_queries(url, self.dietitian_user, self.REVIEW_LIST_QUERIES, 12)
+
+
+class DietitianListBySpecializationTests(APITestCase):
+    def setUp(self):
+        self.specialization = Specialization.objects.create(code='sports', name='Sports Nutrition')
+        self.dietitian_ids = set()
+        for index in range(7):
+            user = User.objects.create_user(
+                email=f'dietitian{index}@example.com',
+                password='password',
+                user_type=UserType.DIETITIAN
+            )
+            dietitian = DietitianProfile.objects.create(user=user, experience_years=index % 3)
+            dietitian.specializations.add(self.specialization)
+            self.dietitian_ids.add(dietitian.id)
+
+        client_user = User.objects.create_user(
+            email='client@example.com',
+            password='password',
+            user_type=UserType.CLIENT
+        )
+        ClientProfile.objects.create(user=client_user)
+        self.client.force_authenticate(User.objects.get(pk=client_user.pk))
+        self.url = reverse('dietitian-list-by-specialization', args=[self.specialization.id])
+
+    def test_pages_through_every_dietitian_once(self):
+        ids = []
+        response = self.client.get(self.url, {'page_size': 3})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            ids.extend(dietitian['id'] for dietitian in response.data['results'])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(set(ids), self.dietitian_ids)
+
+    def test_score_change_reranks_under_specialization_lock(self):
+        dietitian = DietitianProfile.objects.filter(id__in=self.dietitian_ids).order_by('experience_years', 'id').first()
+        dietitian.experience_years = 30
+        with CaptureQueriesContext(connection) as queries:
+            dietitian.save()
+
+        self.assertTrue(any(
+            'FOR UPDATE' in query['sql'] and 'users_specialization' in query['sql']
+            for query in queries.captured_queries
+        ))
+        ranks = DietitianSpecializationRank.objects.filter(specialization=self.specialization).order_by('rank')
+        self.assertEqual(list(ranks.values_list('rank', flat=True)), list(range(1, 8)))
+        self.assertEqual(ranks.first().dietitian_id, dietitian.id)
+
+    def test_unknown_specialization_returns_not_found(self):
+        response = self.client.get(reverse('dietitian-list-by-specialization', args=[self.specialization.id + 100]))
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_forged_cursor_returns_not_found(self):
+        for values in (['x', 'y'], [1.5, 'y'], [None, 1], [[1], 2], 'abc'):
+            cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+            response = self.client.get(self.url, {'cursor': cursor})
+            self.assertEqual(response.status_code, 404, values)
+
+
+class DietitianReviewStatisticsViewTests(APITestCase):
+    def setUp(self):
+        specialization = Specialization.objects.create(code='diabetes', name='Diabetes')
+        dietitian_user = User.objects.create_user(
+            email='dietitian@example.com',
+            password='password',
+            user_type=UserType.DIETITIAN
+        )
+        self.dietitian = DietitianProfile.objects.create(user=dietitian_user)
+        self.reviews = []
+        for index, (rating, review_status) in enumerate((
+            (4, ReviewStatus.ACCEPTED),
+            (5, ReviewStatus.ACCEPTED),
+            (5, ReviewStatus.ACCEPTED),
+            (1, ReviewStatus.PENDING),
+            (2, ReviewStatus.REJECTED),
+        )):
+            user = User.objects.create_user(
+                email=f'client{index}@example.com',
+                password='password',
+                user_type=UserType.CLIENT
+            )
+            matching = MatchModel.objects.create(
+                client=ClientProfile.objects.create(user=user),
+                dietitian=self.dietitian,
+                specialization=specialization,
+                status=MatchingStatus.ACCEPTED
+            )
+            self.reviews.append(Review.objects.create(matching=matching, rating=rating, status=review_status))
+        DietitianScoringService.refresh_dietitian_score(self.dietitian)
+        self.client.force_authenticate(User.objects.get(pk=dietitian_user.pk))
+
+    def test_returns_serialized_statistics(self):
+        response = self.client.get(reverse('dietitian-review-statistics', args=[self.dietitian.id]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertAlmostEqual(response.data['average_rating'], 14 / 3)
+        self.assertEqual(response.data['rating_count'], 3)
+        self.assertEqual(response.data['rating_distribution'], {'1': 0, '2': 0, '3': 0, '4': 1, '5': 2})
+
+    def get_statistics(self):
+        response = self.client.get(reverse('dietitian-review-statistics', args=[self.dietitian.id]))
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def set_status(self, review, review_status):
+        response = self.client.patch(reverse('review-status', args=[review.id]), {'status': review_status})
+        self.assertEqual(response.status_code, 200)
+
+    def test_moderation_updates_statistics(self):
+        self.set_status(self.reviews[2], ReviewStatus.REJECTED)
+        statistics = self.get_statistics()
+        self.assertEqual(statistics['rating_count'], 2)
+        self.assertAlmostEqual(statistics['average_rating'], 4.5)
+        self.assertEqual(statistics['rating_distribution']['5'], 1)
+
+        self.set_status(self.reviews[3], ReviewStatus.ACCEPTED)
+        statistics = self.get_statistics()
+        self.assertEqual(statistics['rating_count'], 3)
+        self.assertEqual(statistics['rating_distribution']['1'], 1)
+
+        score = DietitianScore.objects.get(dietitian=self.dietitian)
+        rebuilt_total = score.total_score
+        DietitianScoringService.rebuild_scores()
+        score.refresh_from_db()
+        self.assertEqual(score.review_count, 3)
+        self.assertAlmostEqual(score.total_score, rebuilt_total)
+
+    def test_unknown_dietitian_returns_not_found(self):
+        response = self.client.get(reverse('dietitian-review-statistics', args=[self.dietitian.id + 100]))
+
+        self.assertEqual(response.status_code, 404)
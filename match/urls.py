@@ -2,8 +2,11 @@ from django.urls import path
 from .views import (
     SpecializationChoiceListCreateView,
     DietitianListBySpecializationView,
+    RecommendedDietitianListView,
+    DietitianReviewStatisticsView,
     MatchingListCreateView,
     MatchingRetrieveUpdateDestroyView,
+    MatchingBulkStatusUpdateView,
     ReviewListCreateView,
     ReviewRetrieveUpdateDestroyView,
     ReviewStatusView
@@ -12,8 +15,11 @@ from .views import (
 urlpatterns = [
     path('specialization-choices/', SpecializationChoiceListCreateView.as_view(), name='specialization-choice-list-create'),
     path('dietitians/by-specialization/<int:specialization_id>/', DietitianListBySpecializationView.as_view(), name='dietitian-list-by-specialization'),
+    path('dietitians/recommended/', RecommendedDietitianListView.as_view(), name='recommended-dietitian-list'),
+    path('dietitians/<int:dietitian_id>/review-stats/', DietitianReviewStatisticsView.as_view(), name='dietitian-review-statistics'),
     path('matchings/', MatchingListCreateView.as_view(), name='matching-list-create'),
     path('matchings/<int:pk>/', MatchingRetrieveUpdateDestroyView.as_view(), name='matching-retrieve-update-destroy'),
+    path('matchings/bulk-status/', MatchingBulkStatusUpdateView.as_view(), name='matching-bulk-status'),
     path('reviews/', ReviewListCreateView.as_view(), name='review-list-create'),
     path('reviews/<int:pk>/', ReviewRetrieveUpdateDestroyView.as_view(), name='review-retrieve-update-destroy'),
     path('review/status/<int:pk>/', ReviewStatusView.as_view(),name='review-status'),
@@ -1,24 +1,29 @@
 from rest_framework import generics, status, exceptions
-from django.db.models import Q
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
+from drf_spectacular.utils import extend_schema
 from .models import MatchModel, Review
 from users.models import DietitianProfile
 from .serializers import (
     MatchingSerializer,
     MatchingUpdateSerializer,
+    MatchingBulkStatusUpdateSerializer,
     ReviewSerializer,
     SpecializationChoiceSerializer,
     DietitianScoreSerializer,
+    DietitianReviewStatisticsSerializer,
     ReviewStatusUpdateSerializer
 )
 from .services import (
     MatchingService,
     ReviewService,
     SpecializationChoiceService,
-    DietitianScoringService
+    DietitianScoringService,
+    DietitianRecommendationService
 )
 from core.permissions import IsClient, IsAdmin
+from core.pagination import KeysetPagination, StandardResultsSetPagination
 from users.models import Specialization, ClientProfile
 from core.enums import UserType, ReviewStatus
 from rest_framework.exceptions import PermissionDenied
@@ -38,46 +43,37 @@ class SpecializationChoiceListCreateView(generics.ListCreateAPIView):
         serializer.instance = choice
 
 
-from rest_framework.response import Response
-
 class DietitianListBySpecializationView(generics.ListAPIView):
     permission_classes = [IsAuthenticated, IsClient]
     serializer_class = DietitianScoreSerializer
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-total_score', 'id')
 
     def get_queryset(self):
-        specialization_id = self.kwargs.get('specialization_id')
+        specialization = generics.get_object_or_404(Specialization, id=self.kwargs.get('specialization_id'))
         search = self.request.query_params.get('search', '').strip()
-        try:
-            specialization = Specialization.objects.get(id=specialization_id)
-            dietitians = DietitianProfile.objects.filter(specializations=specialization)
+        return DietitianScoringService.get_dietitians_by_specialization_queryset(specialization, search)
 
-            if search:
-                dietitians = dietitians.filter(
-                    Q(user__first_name__icontains=search) |  
-                    Q(user__last_name__icontains=search) |   
-                    Q(city__icontains=search)                
-                )
+class DietitianReviewStatisticsView(APIView):
+    permission_classes = [IsAuthenticated]
 
-            return dietitians
-        except Specialization.DoesNotExist:
-            return DietitianProfile.objects.none()
+    @extend_schema(responses=DietitianReviewStatisticsSerializer)
+    def get(self, request, dietitian_id):
+        dietitian = generics.get_object_or_404(DietitianProfile, id=dietitian_id)
+        statistics = DietitianScoringService.get_review_statistics(dietitian)
+        return Response(DietitianReviewStatisticsSerializer(statistics).data)
 
+class RecommendedDietitianListView(generics.ListAPIView):
+    permission_classes = [IsAuthenticated, IsClient]
+    serializer_class = DietitianScoreSerializer
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset() 
-        specialization = Specialization.objects.get(id=self.kwargs['specialization_id'])  
-        scored = DietitianScoringService.get_dietitians_by_specialization_queryset(specialization)  
-        
-        response_data = []
-        for item in scored:
-            data = self.get_serializer(item['dietitian']).data
-            data.update(item['score'])
-            response_data.append(data)
-        return Response(response_data)
+    def get_queryset(self):
+        return DietitianRecommendationService.get_recommended_dietitians_queryset(self.request.user.client_profile)
 
 class MatchingListCreateView(generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = MatchingSerializer
+    pagination_class = StandardResultsSetPagination
 
     def get_queryset(self):
         user_type = self.request.user.user_type
@@ -89,7 +85,7 @@ class MatchingListCreateView(generics.ListCreateAPIView):
             return MatchingService.get_dietitian_matchings(self.request.user.dietitian_profile)
 
         elif user_type == UserType.ADMIN:
-            return MatchModel.objects.all()
+            return MatchingService.with_related(MatchModel.objects.all())
 
         return MatchModel.objects.none()
 
@@ -136,10 +132,37 @@ class MatchingRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
         )
         serializer.instance = updated_matching
 
+    def perform_destroy(self, instance):
+        MatchingService.delete_matching(instance)
+
+
+class MatchingBulkStatusUpdateView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = MatchingBulkStatusUpdateSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        matchings = MatchingService.bulk_update_matching_status(
+            matching_ids=serializer.validated_data['ids'],
+            status=serializer.validated_data['status'],
+            user=request.user
+        )
+
+        return Response(
+            {
+                'status': serializer.validated_data['status'],
+                'updated_ids': sorted(matching.id for matching in matchings)
+            },
+            status=status.HTTP_200_OK
+        )
+
 
 class ReviewListCreateView(generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = ReviewSerializer
+    pagination_class = StandardResultsSetPagination
 
     def get_queryset(self):
         user_type = self.request.user.user_type
@@ -148,7 +171,7 @@ class ReviewListCreateView(generics.ListCreateAPIView):
         elif user_type == UserType.DIETITIAN:
             return ReviewService.get_dietitian_reviews(self.request.user.dietitian_profile)
         elif user_type == UserType.ADMIN:
-            return Review.objects.all()
+            return ReviewService.with_related(Review.objects.all())
         return Review.objects.none()
 
     def perform_create(self, serializer):
@@ -174,12 +197,12 @@ class ReviewRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
         review = self.get_object()
         if review.matching.client.user != self.request.user:
             raise exceptions.PermissionDenied("You can only edit your own comments.")
-        super().perform_update(serializer)
+        serializer.instance = ReviewService.update_review(review, **serializer.validated_data)
 
     def perform_destroy(self, instance):
         if instance.matching.client.user != self.request.user:
             raise exceptions.PermissionDenied("You can only delete your own comments.")
-        super().perform_destroy(instance)
+        ReviewService.delete_review(instance)
 
 
 class ReviewStatusView(generics.UpdateAPIView):
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import DietaryTag, MealCategory, Ingredient, Recipe, RecipeIngredient, MealPlan, RecipeRating, FavoriteRecipe, MacroGoal
+from .services import RecipeService, RecipeNutritionService
 
 class RecipeIngredientInline(admin.TabularInline):
     model = RecipeIngredient
@@ -24,13 +25,19 @@ class IngredientAdmin(admin.ModelAdmin):
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('title', 'category', 'created_by', 'difficulty', 'meal_type', 'created_at', 'approved_by')
+    list_display = ('title', 'category', 'created_by', 'difficulty', 'meal_type', 'total_calories', 'created_at', 'approved_by')
     search_fields = ('title', 'description')
     list_filter = ('difficulty', 'meal_type', 'category', 'dietary_tags')
     ordering = ('-created_at',)
     inlines = [RecipeIngredientInline]  
     autocomplete_fields = ['category', 'created_by', 'approved_by', 'dietary_tags']
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        if 'servings' in form.changed_data:
+            RecipeNutritionService.recompute([form.instance.id])
+        RecipeService.update_search_vectors([form.instance.id])
+
 @admin.register(MealPlan)
 class MealPlanAdmin(admin.ModelAdmin):
     list_display = ('user', 'day', 'meal_type', 'recipe', 'date')
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from meal.services import RecipeNutritionService
+
+
+class Command(BaseCommand):
+    help = "Recompute the stored per-recipe and per-serving nutrition totals from recipe ingredients."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        count = RecipeNutritionService.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt nutrition totals for {count} recipes."))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from meal.services import RecipeService
+
+
+class Command(BaseCommand):
+    help = "Recompute the weighted full-text search vector of every recipe."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        last_id = RecipeService.rebuild_search_vectors(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt search vectors for recipes up to id {last_id}."))
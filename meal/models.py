@@ -1,6 +1,8 @@
 from django.db import models
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from core.models import BaseModel
 from core.enums import Difficulty_Type, Day_Choices
 from .enums import Meal_Type, Unit_Type
@@ -61,6 +63,15 @@ class Recipe(BaseModel):
         related_name='approved_recipes'
     )
     dietary_tags = models.ManyToManyField(DietaryTag, blank=True, related_name='recipes')
+    total_calories = models.FloatField(default=0, editable=False)
+    total_protein = models.FloatField(default=0, editable=False)
+    total_carbs = models.FloatField(default=0, editable=False)
+    total_fat = models.FloatField(default=0, editable=False)
+    calories_per_serving = models.FloatField(default=0, editable=False)
+    protein_per_serving = models.FloatField(default=0, editable=False)
+    carbs_per_serving = models.FloatField(default=0, editable=False)
+    fat_per_serving = models.FloatField(default=0, editable=False)
+    search_vector = SearchVectorField(blank=True, null=True, editable=False)
 
     class Meta:
         ordering = ['-created_at']
@@ -69,31 +80,20 @@ class Recipe(BaseModel):
             models.Index(fields=['category']),
             models.Index(fields=['meal_type']),
             models.Index(fields=['difficulty']),
+            models.Index(fields=['total_calories']),
+            models.Index(fields=['total_protein']),
+            models.Index(fields=['total_carbs']),
+            models.Index(fields=['total_fat']),
+            models.Index(fields=['calories_per_serving']),
+            models.Index(fields=['protein_per_serving']),
+            models.Index(fields=['carbs_per_serving']),
+            models.Index(fields=['fat_per_serving']),
+            GinIndex(fields=['search_vector']),
         ]
 
     def __str__(self):
         return self.title
 
-    @property
-    def total_calories(self):
-        return sum(ingredient.quantity * ingredient.ingredient.calories_per_100g / 100 
-                  for ingredient in self.ingredients.all())
-
-    @property
-    def total_protein(self):
-        return sum(ingredient.quantity * ingredient.ingredient.protein_per_100g / 100 
-                  for ingredient in self.ingredients.all())
-
-    @property
-    def total_carbs(self):
-        return sum(ingredient.quantity * ingredient.ingredient.carbs_per_100g / 100 
-                  for ingredient in self.ingredients.all())
-
-    @property
-    def total_fat(self):
-        return sum(ingredient.quantity * ingredient.ingredient.fat_per_100g / 100 
-                  for ingredient in self.ingredients.all())
-
     @property
     def estimated_total_time(self):
         return self.preparation_time + self.cooking_time
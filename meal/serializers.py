@@ -11,6 +11,7 @@ from .models import (
     MacroGoal,
 )
 from django.db.models import Avg
+from .services import RecipeService, RecipeNutritionService
 from users.models import User
 
 class DietaryTagSerializer(serializers.ModelSerializer):
@@ -75,10 +76,6 @@ class RecipeSerializer(serializers.ModelSerializer):
         write_only=True,
         many=True
     )
-    total_calories = serializers.FloatField(read_only=True)
-    total_protein = serializers.FloatField(read_only=True)
-    total_carbs = serializers.FloatField(read_only=True)
-    total_fat = serializers.FloatField(read_only=True)
     average_rating = serializers.SerializerMethodField()
 
     class Meta:
@@ -90,6 +87,8 @@ class RecipeSerializer(serializers.ModelSerializer):
             'category', 'category_id',
             'ingredients', 'dietary_tags', 'dietary_tag_ids',
             'total_calories', 'total_protein', 'total_carbs', 'total_fat',
+            'calories_per_serving', 'protein_per_serving',
+            'carbs_per_serving', 'fat_per_serving',
             'average_rating', 'created_at', 'updated_at'
         ]
         read_only_fields = ['created_at', 'updated_at', 'created_by']
@@ -103,12 +102,17 @@ class RecipeSerializer(serializers.ModelSerializer):
 
         recipe = Recipe.objects.create(**validated_data)
 
-        for ingredient_data in ingredients_data:
-            RecipeIngredient.objects.create(recipe=recipe, **ingredient_data)
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(recipe=recipe, **ingredient_data)
+            for ingredient_data in ingredients_data
+        ])
 
         if dietary_tags_data:
             recipe.dietary_tags.set(dietary_tags_data)
 
+        RecipeNutritionService.recompute([recipe.id])
+        RecipeService.update_search_vectors([recipe.id])
+        recipe.refresh_from_db(fields=RecipeNutritionService.get_fields())
         return recipe
 
     def update(self, instance, validated_data):
@@ -120,9 +124,14 @@ class RecipeSerializer(serializers.ModelSerializer):
 
         if ingredients_data is not None:
             instance.ingredients.all().delete()
-            for ingredient_data in ingredients_data:
-                RecipeIngredient.objects.create(recipe=instance, **ingredient_data)
-
+            RecipeIngredient.objects.bulk_create([
+                RecipeIngredient(recipe=instance, **ingredient_data)
+                for ingredient_data in ingredients_data
+            ])
+
+        RecipeNutritionService.recompute([instance.id])
+        RecipeService.update_search_vectors([instance.id])
+        instance.refresh_from_db(fields=RecipeNutritionService.get_fields())
         return instance
     
 class MealPlanSerializer(serializers.ModelSerializer):
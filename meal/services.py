@@ -7,57 +7,124 @@ from .models import (
     RecipeRating,
     FavoriteRecipe,
     MacroGoal,
+    DietaryTag,
 )
-from django.db.models import Avg, Count, Q, Sum, F, ExpressionWrapper, FloatField
+from django.db.models import Avg, Count, Sum, F, FloatField, Value
+from django.db.models.functions import Cast
+from django.contrib.postgres.search import SearchRank, SearchVector
 from django.core.cache import cache
 from django.conf import settings
 from rest_framework import exceptions
 from django.utils import timezone
 from datetime import timedelta
 from core.enums import UserType
+from core.services import FullTextSearchService
 
 class RecipeService:
+    NUTRITION_RANGE_FIELDS = {
+        'calories': 'total_calories',
+        'protein': 'total_protein',
+        'carbs': 'total_carbs',
+        'fat': 'total_fat',
+        'calories_per_serving': 'calories_per_serving',
+        'protein_per_serving': 'protein_per_serving',
+        'carbs_per_serving': 'carbs_per_serving',
+        'fat_per_serving': 'fat_per_serving',
+    }
+
     @staticmethod
-    def search_recipes(query, filters=None):
-        cache_key = f'recipe_search_{query}_{filters}'
-        cached_results = cache.get(cache_key)
-        
-        if cached_results:
-            return cached_results
+    def get_nutrition_range_filters(filters):
+        lookups = {}
+        for name, field in RecipeService.NUTRITION_RANGE_FIELDS.items():
+            for bound, lookup in (('min', 'gte'), ('max', 'lte')):
+                value = filters.get(f'{bound}_{name}')
+                if value in (None, ''):
+                    continue
+                try:
+                    lookups[f'{field}__{lookup}'] = float(value)
+                except (TypeError, ValueError):
+                    raise exceptions.ValidationError({f'{bound}_{name}': "A valid number is required."})
+        return lookups
 
-        queryset = Recipe.objects.all()
-        
-        if query:
-            queryset = queryset.filter(
-                Q(title__icontains=query) |
-                Q(description__icontains=query) |
-                Q(instructions__icontains=query)
+    @staticmethod
+    def get_id_filter(filters, key):
+        values = filters.get(key) or []
+        if not isinstance(values, (list, tuple)):
+            values = [values]
+        try:
+            return [int(value) for value in values if value not in (None, '')]
+        except (TypeError, ValueError):
+            raise exceptions.ValidationError({key: "A list of valid ids is required."})
+
+    @staticmethod
+    def get_search_vector():
+        config = settings.SEARCH_CONFIG
+        return (
+            SearchVector('title', weight='A', config=config) +
+            SearchVector('description', weight='B', config=config) +
+            SearchVector('instructions', weight='C', config=config)
+        )
+
+    @staticmethod
+    def update_search_vectors(recipe_ids):
+        if recipe_ids:
+            Recipe.objects.filter(id__in=recipe_ids).update(search_vector=RecipeService.get_search_vector())
+
+    @staticmethod
+    def rebuild_search_vectors(batch_size=5000):
+        last_id = Recipe.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        for start in range(0, last_id, batch_size):
+            Recipe.objects.filter(id__gt=start, id__lte=start + batch_size).update(
+                search_vector=RecipeService.get_search_vector()
             )
-        
-        if filters:
-            if filters.get('category'):
-                queryset = queryset.filter(category_id=filters['category'])
-            if filters.get('meal_type'):
-                queryset = queryset.filter(meal_type=filters['meal_type'])
-            if filters.get('difficulty'):
-                queryset = queryset.filter(difficulty=filters['difficulty'])
-            if filters.get('min_rating'):
-                queryset = queryset.annotate(
-                    avg_rating=Avg('ratings__rating')
-                ).filter(avg_rating__gte=filters['min_rating'])
-            if filters.get('max_calories'):
-                queryset = queryset.annotate(
-                    total_calories=Sum(
-                        ExpressionWrapper(
-                            F('ingredients__quantity') * F('ingredients__ingredient__calories_per_100g') / 100,
-                            output_field=FloatField()
-                        )
-                    )
-                ).filter(total_calories__lte=filters['max_calories'])
-
-        results = list(queryset)
-        cache.set(cache_key, results, settings.CACHE_TTL)
-        return results
+        return last_id
+
+    @staticmethod
+    def search_recipes(query, filters=None, queryset=None):
+        filters = filters or {}
+        queryset = Recipe.objects.all() if queryset is None else queryset
+
+        search_query = FullTextSearchService.build_query(query, config=settings.SEARCH_CONFIG)
+        if search_query is not None:
+            queryset = queryset.filter(search_vector=search_query).annotate(
+                rank=Cast(SearchRank(F('search_vector'), search_query), FloatField())
+            )
+        else:
+            queryset = queryset.annotate(rank=Value(0.0, output_field=FloatField()))
+
+        category_ids = RecipeService.get_id_filter(filters, 'category')
+        if category_ids:
+            queryset = queryset.filter(category_id__in=category_ids)
+        for tag_id in RecipeService.get_id_filter(filters, 'dietary_tags'):
+            queryset = queryset.filter(dietary_tags__id=tag_id)
+        if filters.get('meal_type'):
+            queryset = queryset.filter(meal_type=filters['meal_type'])
+        if filters.get('difficulty'):
+            queryset = queryset.filter(difficulty=filters['difficulty'])
+        if filters.get('min_rating'):
+            queryset = queryset.annotate(
+                avg_rating=Avg('ratings__rating')
+            ).filter(avg_rating__gte=filters['min_rating'])
+        queryset = queryset.filter(**RecipeService.get_nutrition_range_filters(filters))
+
+        return queryset.order_by('-rank', '-created_at')
+
+    @staticmethod
+    def get_search_facets(queryset):
+        recipe_ids = queryset.order_by().values('id')
+        return {
+            'categories': list(
+                MealCategory.objects.filter(recipes__id__in=recipe_ids).values('id', 'name').annotate(
+                    count=Count('recipes')
+                ).order_by('-count', 'name')
+            ),
+            'dietary_tags': list(
+                DietaryTag.objects.filter(recipes__id__in=recipe_ids).values('id', 'name').annotate(
+                    count=Count('recipes')
+                ).order_by('-count', 'name')
+            ),
+        }
+
     @staticmethod
     def get_popular_recipes(limit=10):
         cache_key = f'popular_recipes_{limit}'
@@ -85,6 +152,63 @@ class RecipeService:
         recipe.save()
         return recipe
 
+class RecipeNutritionService:
+    MACROS = ('calories', 'protein', 'carbs', 'fat')
+
+    @staticmethod
+    def get_fields():
+        return [
+            f'{prefix}{macro}{suffix}'
+            for macro in RecipeNutritionService.MACROS
+            for prefix, suffix in (('total_', ''), ('', '_per_serving'))
+        ]
+
+    @staticmethod
+    def recompute(recipe_ids, batch_size=500):
+        recipe_ids = list(recipe_ids)
+        for start in range(0, len(recipe_ids), batch_size):
+            RecipeNutritionService.recompute_batch(recipe_ids[start:start + batch_size])
+        return len(recipe_ids)
+
+    @staticmethod
+    def recompute_batch(recipe_ids):
+        macros = RecipeNutritionService.MACROS
+        totals = {
+            row['recipe_id']: row
+            for row in RecipeIngredient.objects.filter(
+                recipe_id__in=recipe_ids
+            ).values('recipe_id').annotate(**{
+                f'total_{macro}': Sum(
+                    F('quantity') * F(f'ingredient__{macro}_per_100g') / 100,
+                    output_field=FloatField()
+                )
+                for macro in macros
+            })
+        }
+
+        recipes = list(Recipe.objects.filter(id__in=recipe_ids).only('id', 'servings'))
+        for recipe in recipes:
+            row = totals.get(recipe.id, {})
+            for macro in macros:
+                total = row.get(f'total_{macro}') or 0
+                setattr(recipe, f'total_{macro}', total)
+                setattr(recipe, f'{macro}_per_serving', total / recipe.servings if recipe.servings else 0)
+
+        Recipe.objects.bulk_update(recipes, RecipeNutritionService.get_fields())
+
+    @staticmethod
+    def recompute_for_ingredients(ingredient_ids, batch_size=500):
+        recipe_ids = RecipeIngredient.objects.filter(
+            ingredient_id__in=ingredient_ids
+        ).values_list('recipe_id', flat=True).distinct()
+        return RecipeNutritionService.recompute(recipe_ids, batch_size=batch_size)
+
+    @staticmethod
+    def rebuild(batch_size=500):
+        recipe_ids = Recipe.objects.order_by('id').values_list('id', flat=True)
+        return RecipeNutritionService.recompute(recipe_ids, batch_size=batch_size)
+
+
 class MealPlanService:
     @staticmethod
     def create_meal_plan(request_user, data):
@@ -108,9 +232,9 @@ class MealPlanService:
 
     @staticmethod
     def get_daily_calories(user, date):
-        meal_plans = MealPlan.objects.filter(user=user, date=date)
-        total_calories = sum(meal_plan.recipe.total_calories for meal_plan in meal_plans)
-        return total_calories
+        return MealPlan.objects.filter(user=user, date=date).aggregate(
+            total_calories=Sum('recipe__total_calories')
+        )['total_calories'] or 0
 
 
 class RecipeRatingService:
@@ -0,0 +1,26 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Ingredient, Recipe, RecipeIngredient
+from .services import RecipeNutritionService
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return
+    if update_fields is not None and not any(field.endswith('_per_100g') for field in update_fields):
+        return
+    RecipeNutritionService.recompute_for_ingredients([instance.id])
+
+
+@receiver(post_save, sender=RecipeIngredient)
+def recipe_ingredient_saved(sender, instance, **kwargs):
+    RecipeNutritionService.recompute([instance.recipe_id])
+
+
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredient_deleted(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, (Recipe, QuerySet)):
+        return
+    RecipeNutritionService.recompute([instance.recipe_id])
@@ -1,3 +1,220 @@
-from django.test import TestCase
+import unittest
+from unittest import mock
+from django.db import connection
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from core.enums import UserType, Difficulty_Type
+from users.models import User
+from .enums import Meal_Type, Unit_Type
+from .models import MealCategory, DietaryTag, Recipe, Ingredient, RecipeIngredient
+from .serializers import RecipeSerializer
+from .services import RecipeService, RecipeNutritionService
 
-# Create your tests here.
+
+class RecipeTestMixin:
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='admin@example.com',
+            password='password',
+            user_type=UserType.ADMIN,
+            is_staff=True
+        )
+        self.breakfast = MealCategory.objects.create(name='Breakfast')
+        self.dinner = MealCategory.objects.create(name='Dinner')
+        self.client.force_authenticate(self.user)
+
+    def create_recipe(self, title, description='', instructions='', category=None, tags=()):
+        recipe = Recipe.objects.create(
+            title=title,
+            description=description,
+            instructions=instructions,
+            preparation_time=5,
+            cooking_time=10,
+            servings=2,
+            difficulty=Difficulty_Type.EASY,
+            meal_type=Meal_Type.BREAKFAST,
+            category=category or self.breakfast,
+            created_by=self.user,
+            approved_by=self.user
+        )
+        recipe.dietary_tags.set(tags)
+        RecipeService.update_search_vectors([recipe.id])
+        return recipe
+
+    def search(self, params):
+        response = self.client.get(reverse('recipe-search'), params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+
+class RecipeNutritionSignalTests(RecipeTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.oats = Ingredient.objects.create(
+            name='Oats',
+            calories_per_100g=380,
+            protein_per_100g=13,
+            carbs_per_100g=67,
+            fat_per_100g=7
+        )
+        self.recipe = self.create_recipe('Oat porridge')
+        self.portion = RecipeIngredient.objects.create(
+            recipe=self.recipe,
+            ingredient=self.oats,
+            quantity=200,
+            unit=Unit_Type.G
+        )
+
+    def assert_totals(self, calories, protein):
+        self.recipe.refresh_from_db()
+        self.assertAlmostEqual(self.recipe.total_calories, calories)
+        self.assertAlmostEqual(self.recipe.total_protein, protein)
+        self.assertAlmostEqual(self.recipe.calories_per_serving, calories / self.recipe.servings)
+
+    def test_adding_ingredient_updates_totals(self):
+        self.assert_totals(760, 26)
+
+    def test_per_100g_edit_updates_recipe_totals(self):
+        self.oats.calories_per_100g = 400
+        self.oats.protein_per_100g = 15
+        self.oats.save()
+
+        self.assert_totals(800, 30)
+
+    def test_quantity_edit_and_removal_update_totals(self):
+        self.portion.quantity = 100
+        self.portion.save()
+        self.assert_totals(380, 13)
+
+        self.portion.delete()
+        self.assert_totals(0, 0)
+
+    def test_serializer_ingredient_replace_recomputes_once(self):
+        milk = Ingredient.objects.create(
+            name='Milk',
+            calories_per_100g=60,
+            protein_per_100g=3,
+            carbs_per_100g=5,
+            fat_per_100g=3
+        )
+        RecipeIngredient.objects.create(recipe=self.recipe, ingredient=milk, quantity=100, unit=Unit_Type.ML)
+
+        with mock.patch(
+            'meal.services.RecipeNutritionService.recompute',
+            wraps=RecipeNutritionService.recompute
+        ) as recompute:
+            RecipeSerializer().update(self.recipe, {'ingredients': [
+                {'ingredient': self.oats, 'quantity': 100, 'unit': Unit_Type.G},
+                {'ingredient': milk, 'quantity': 200, 'unit': Unit_Type.ML},
+            ]})
+
+        recompute.assert_called_once_with([self.recipe.id])
+        self.assert_totals(500, 19)
+
+
+class RecipeNutritionRangeFilterTests(RecipeTestMixin, APITestCase):
+    def create_with_nutrition(self, title, calories, protein_per_serving):
+        recipe = self.create_recipe(title)
+        Recipe.objects.filter(id=recipe.id).update(
+            total_calories=calories,
+            protein_per_serving=protein_per_serving
+        )
+        return recipe
+
+    def result_ids(self, params):
+        return {recipe['id'] for recipe in self.search(params).data['results']}
+
+    def test_bounds_are_inclusive(self):
+        light = self.create_with_nutrition('Salad', 200, 5)
+        medium = self.create_with_nutrition('Pasta', 400, 15)
+        heavy = self.create_with_nutrition('Burger', 600, 30)
+
+        self.assertEqual(self.result_ids({'min_calories': 200, 'max_calories': 400}), {light.id, medium.id})
+        self.assertEqual(self.result_ids({'min_protein_per_serving': 15}), {medium.id, heavy.id})
+        self.assertEqual(self.result_ids({'max_protein_per_serving': 5, 'min_calories': '200'}), {light.id})
+
+    def test_non_numeric_bound_returns_bad_request(self):
+        self.create_with_nutrition('Salad', 200, 5)
+
+        response = self.client.get(reverse('recipe-search'), {'max_calories': 'lots'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('max_calories', response.data)
+
+
+class RecipeSearchFacetTests(RecipeTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.vegan = DietaryTag.objects.create(name='Vegan')
+        self.gluten_free = DietaryTag.objects.create(name='Gluten Free')
+
+    def test_dietary_tag_filter_requires_every_tag(self):
+        self.create_recipe('Oat porridge', tags=[self.vegan])
+        both = self.create_recipe('Chia pudding', tags=[self.vegan, self.gluten_free])
+        self.create_recipe('Omelette', tags=[self.gluten_free])
+
+        response = self.search({'dietary_tag': [self.vegan.id, self.gluten_free.id]})
+
+        self.assertEqual([recipe['id'] for recipe in response.data['results']], [both.id])
+
+    def test_facets_count_matched_recipes(self):
+        self.create_recipe('Oat porridge', tags=[self.vegan])
+        self.create_recipe('Chia pudding', tags=[self.vegan, self.gluten_free])
+        self.create_recipe('Lentil stew', category=self.dinner, tags=[self.vegan])
+
+        response = self.search({'dietary_tag': self.vegan.id, 'page_size': 1})
+
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['facets'], {
+            'categories': [
+                {'id': self.breakfast.id, 'name': 'Breakfast', 'count': 2},
+                {'id': self.dinner.id, 'name': 'Dinner', 'count': 1},
+            ],
+            'dietary_tags': [
+                {'id': self.vegan.id, 'name': 'Vegan', 'count': 3},
+                {'id': self.gluten_free.id, 'name': 'Gluten Free', 'count': 1},
+            ],
+        })
+
+    def test_invalid_facet_id_is_rejected(self):
+        response = self.client.get(reverse('recipe-search'), {'category': 'breakfast'})
+
+        self.assertEqual(response.status_code, 400)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', "Full-text search requires PostgreSQL.")
+class RecipeFullTextSearchTests(RecipeTestMixin, APITestCase):
+    def test_title_matches_rank_above_instruction_matches(self):
+        in_instructions = self.create_recipe('Green soup', instructions='Simmer the lentils for twenty minutes.')
+        in_description = self.create_recipe('Winter soup', description='A hearty lentil soup.')
+        in_title = self.create_recipe('Red lentil curry')
+        self.create_recipe('Pancakes', description='Fluffy and sweet.')
+
+        response = self.search({'q': 'lentil'})
+
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [in_title.id, in_description.id, in_instructions.id]
+        )
+
+    def test_prefix_matching(self):
+        lentil = self.create_recipe('Lentil curry')
+        self.create_recipe('Pancakes')
+
+        response = self.search({'q': 'lent'})
+
+        self.assertEqual([recipe['id'] for recipe in response.data['results']], [lentil.id])
+
+    def test_equal_rank_results_page_without_duplicates_or_gaps(self):
+        recipe_ids = {self.create_recipe(f'Overnight oats {index}').id for index in range(12)}
+
+        ids = []
+        response = self.search({'q': 'oats', 'page_size': 5})
+        while True:
+            ids.extend(recipe['id'] for recipe in response.data['results'])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(set(ids), recipe_ids)
@@ -32,6 +32,7 @@ from .services import (
 from django.utils import timezone
 from datetime import datetime, timedelta
 from core.enums import UserType
+from core.pagination import KeysetPagination
 from .permissions import CanViewOnly
 
 
@@ -50,15 +51,19 @@ class IngredientListView(generics.ListAPIView):
 class RecipeListCreateView(generics.ListCreateAPIView):
     serializer_class = RecipeSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    filter_backends = [DjangoFilterBackend]
     filterset_fields = ['category', 'meal_type', 'difficulty']
-    search_fields = ['title', 'description']
 
     def get_queryset(self):
         user = self.request.user
-        if user.is_staff or user.user_type == UserType.ADMIN:
-            return Recipe.objects.all()
-        return Recipe.objects.filter(approved_by__isnull=False)
+        queryset = Recipe.objects.all()
+        if not (user.is_staff or user.user_type == UserType.ADMIN):
+            queryset = queryset.filter(approved_by__isnull=False)
+
+        search = self.request.query_params.get('search')
+        if search:
+            queryset = RecipeService.search_recipes(search, queryset=queryset)
+        return queryset
     
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
@@ -73,17 +78,32 @@ class RecipeRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
 class RecipeSearchView(generics.ListAPIView):
     serializer_class = RecipeSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-rank', '-id')
 
     def get_queryset(self):
-        query = self.request.query_params.get('q', '')
+        params = self.request.query_params
         filters = {
-            'category': self.request.query_params.get('category'),
-            'meal_type': self.request.query_params.get('meal_type'),
-            'difficulty': self.request.query_params.get('difficulty'),
-            'min_rating': self.request.query_params.get('min_rating'),
-            'max_calories': self.request.query_params.get('max_calories'),
+            'category': params.getlist('category'),
+            'dietary_tags': params.getlist('dietary_tag'),
+            'meal_type': params.get('meal_type'),
+            'difficulty': params.get('difficulty'),
+            'min_rating': params.get('min_rating'),
         }
-        return RecipeService.search_recipes(query, filters)
+        for name in RecipeService.NUTRITION_RANGE_FIELDS:
+            for bound in ('min', 'max'):
+                value = params.get(f'{bound}_{name}')
+                if value is not None:
+                    filters[f'{bound}_{name}'] = value
+        return RecipeService.search_recipes(params.get('q', ''), filters)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        response = self.get_paginated_response(serializer.data)
+        response.data['facets'] = RecipeService.get_search_facets(queryset)
+        return response
 
 class ApproveRecipeView(generics.UpdateAPIView):
     serializer_class= RecipeSerializer
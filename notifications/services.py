@@ -1,50 +1,84 @@
+from django.db import transaction
 from core.enums import MatchingStatus
 from .enums import NotificationType
-from notifications.tasks import send_notification_email 
+from notifications.tasks import send_notification_email, send_notification_emails
 
 class NotificationService:
     @staticmethod
-    def send_matching_status_notification(matching, old_status, new_status):
-        from notifications.models import Notification
-        
+    def get_matching_status_content(matching, new_status):
+        dietitian_name = matching.dietitian.user.get_full_name()
+
         if new_status == MatchingStatus.ACCEPTED:
-            Notification.objects.create(
-                user=matching.client.user,
-                title="Match Approved",
-                message=f"Your match with {matching.dietitian.user.get_full_name()} has been approved.",
-                notification_type=NotificationType.MATCHING_ACCEPTED
-            )
-            send_notification_email.delay(
-                matching.client.user.email,
-                "Your Match Has Been Approved",
-                f"Your match with {matching.dietitian.user.get_full_name()} has been approved. You can now start your journey together!"
-            )
+            return {
+                'title': "Match Approved",
+                'message': f"Your match with {dietitian_name} has been approved.",
+                'notification_type': NotificationType.MATCHING_ACCEPTED,
+                'email_subject': "Your Match Has Been Approved",
+                'email_message': f"Your match with {dietitian_name} has been approved. You can now start your journey together!",
+            }
 
         elif new_status == MatchingStatus.REJECTED:
-            Notification.objects.create(
-                user=matching.client.user,
-                title="Match Rejected",
-                message=f"Your match request with {matching.dietitian.user.get_full_name()} has been rejected.",
-                notification_type=NotificationType.MATCHING_REJECTED
-            )
-            send_notification_email.delay(
-                matching.client.user.email,
-                "Your Match Request Has Been Rejected",
-                f"Unfortunately, your match request with {matching.dietitian.user.get_full_name()} has been rejected. You can try connecting with another dietitian."
-            )
+            return {
+                'title': "Match Rejected",
+                'message': f"Your match request with {dietitian_name} has been rejected.",
+                'notification_type': NotificationType.MATCHING_REJECTED,
+                'email_subject': "Your Match Request Has Been Rejected",
+                'email_message': f"Unfortunately, your match request with {dietitian_name} has been rejected. You can try connecting with another dietitian.",
+            }
 
         elif new_status == MatchingStatus.ENDED:
-            Notification.objects.create(
+            return {
+                'title': "Match Ended",
+                'message': f"Your match with {dietitian_name} has ended.",
+                'notification_type': NotificationType.MATCHING_ENDED,
+                'email_subject': "Your Match Has Ended",
+                'email_message': f"Your match with {dietitian_name} has ended. You can find a new dietitian through the platform.",
+            }
+
+        return None
+
+    @staticmethod
+    def send_matching_status_notification(matching, old_status, new_status):
+        from notifications.models import Notification
+
+        content = NotificationService.get_matching_status_content(matching, new_status)
+        if content is None:
+            return
+
+        Notification.objects.create(
+            user=matching.client.user,
+            title=content['title'],
+            message=content['message'],
+            notification_type=content['notification_type']
+        )
+        send_notification_email.delay(
+            matching.client.user.email,
+            content['email_subject'],
+            content['email_message']
+        )
+
+    @staticmethod
+    def send_bulk_matching_status_notifications(matchings, new_status):
+        from notifications.models import Notification
+
+        notifications = []
+        emails = []
+        for matching in matchings:
+            content = NotificationService.get_matching_status_content(matching, new_status)
+            if content is None:
+                continue
+
+            notifications.append(Notification(
                 user=matching.client.user,
-                title="Match Ended",
-                message=f"Your match with {matching.dietitian.user.get_full_name()} has ended.",
-                notification_type=NotificationType.MATCHING_ENDED
-            )
-            send_notification_email.delay(
-                matching.client.user.email,
-                "Your Match Has Ended",
-                f"Your match with {matching.dietitian.user.get_full_name()} has ended. You can find a new dietitian through the platform."
-            )
+                title=content['title'],
+                message=content['message'],
+                notification_type=content['notification_type']
+            ))
+            emails.append((matching.client.user.email, content['email_subject'], content['email_message']))
+
+        Notification.objects.bulk_create(notifications)
+        if emails:
+            transaction.on_commit(lambda: send_notification_emails.delay(emails))
 
     @staticmethod
     def send_review_notification(review):
@@ -61,4 +95,4 @@ class NotificationService:
             review.matching.dietitian.user.email,
             "You Received a New Review",
             f"{review.matching.client.user.get_full_name()} has submitted a new review for you. Please log in to the platform to view the details."
-        )
\ No newline at end of file
+        )
@@ -1,5 +1,5 @@
 from celery import shared_task
-from django.core.mail import send_mail
+from django.core.mail import send_mail, get_connection, EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.conf import settings
 
@@ -20,4 +20,29 @@ def send_notification_email(email, subject, message):
         [email],
         html_message=html_message,
         fail_silently=False,
-    )
\ No newline at end of file
+    )
+
+
+@shared_task
+def send_notification_emails(emails):
+    connection = get_connection(fail_silently=False)
+    messages = []
+
+    for email, subject, message in emails:
+        context = {
+            'subject': subject,
+            'message': message,
+            'domain': settings.FRONTEND_URL,
+        }
+
+        mail = EmailMultiAlternatives(
+            subject,
+            message,
+            settings.DEFAULT_FROM_EMAIL,
+            [email],
+            connection=connection,
+        )
+        mail.attach_alternative(render_to_string('email/notification_email.html', context), 'text/html')
+        messages.append(mail)
+
+    return connection.send_messages(messages)
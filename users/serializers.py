@@ -140,4 +140,11 @@ class HealthMetricSerializer(serializers.ModelSerializer):
                     "weight": "Weight is required for BMI.",
                     "height": "Height is required for BMI."
                 })
-        return super().create(validated_data)
\ No newline at end of file
+        return super().create(validated_data)
+
+class OnlineUsersQuerySerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=200
+    )
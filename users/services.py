@@ -1,4 +1,6 @@
 from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.core.cache import cache
 from .models import DietitianProfile, ClientProfile, Specialization, HealthMetric
 from .enums import HealthMetricType
 from core.enums import UserType
@@ -116,4 +118,58 @@ class HealthMetricService:
     def get_metrics(user=None):
         if user and user.is_staff or user.user_type == UserType.DIETITIAN:
             return HealthMetric.objects.all()
-        return HealthMetric.objects.filter(client=user) 
\ No newline at end of file
+        return HealthMetric.objects.filter(client=user) 
+
+class PresenceService:
+    @staticmethod
+    def presence_key(user_id):
+        return f'presence_{user_id}'
+
+    @staticmethod
+    def connect(user_id):
+        key = PresenceService.presence_key(user_id)
+        cache.add(key, 0, settings.PRESENCE_TTL)
+        connections = cache.incr(key)
+        cache.touch(key, settings.PRESENCE_TTL)
+
+        if connections == 1:
+            User.objects.filter(id=user_id, is_online=False).update(is_online=True)
+        return connections
+
+    @staticmethod
+    def heartbeat(user_id):
+        key = PresenceService.presence_key(user_id)
+        if not cache.touch(key, settings.PRESENCE_TTL) and cache.add(key, 1, settings.PRESENCE_TTL):
+            User.objects.filter(id=user_id, is_online=False).update(is_online=True)
+
+    @staticmethod
+    def disconnect(user_id):
+        key = PresenceService.presence_key(user_id)
+        try:
+            connections = cache.decr(key)
+        except ValueError:
+            return 0
+
+        if connections <= 0:
+            cache.delete(key)
+            return 0
+        return connections
+
+    @staticmethod
+    def get_online_user_ids(user_ids):
+        keys = {PresenceService.presence_key(user_id): user_id for user_id in user_ids}
+        return [
+            keys[key]
+            for key, connections in cache.get_many(keys).items()
+            if connections and connections > 0
+        ]
+
+    @staticmethod
+    def flush_presence(batch_size=1000):
+        online_ids = list(User.objects.filter(is_online=True).values_list('id', flat=True))
+        flushed = 0
+        for start in range(0, len(online_ids), batch_size):
+            batch = online_ids[start:start + batch_size]
+            offline_ids = set(batch) - set(PresenceService.get_online_user_ids(batch))
+            flushed += User.objects.filter(id__in=offline_ids, is_online=True).update(is_online=False)
+        return flushed
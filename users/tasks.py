@@ -0,0 +1,7 @@
+from celery import shared_task
+from .services import PresenceService
+
+
+@shared_task
+def flush_user_presence():
+    return PresenceService.flush_presence()
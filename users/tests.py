@@ -1,3 +1,29 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from core.enums import UserType
+from .models import User
+from .services import PresenceService
 
-# Create your tests here.
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class PresenceServiceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='client@example.com',
+            password='password',
+            user_type=UserType.CLIENT
+        )
+
+    def test_heartbeat_re_registers_lapsed_user_as_online(self):
+        PresenceService.connect(self.user.id)
+        cache.delete(PresenceService.presence_key(self.user.id))
+        PresenceService.flush_presence()
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_online)
+
+        PresenceService.heartbeat(self.user.id)
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_online)
+        self.assertEqual(PresenceService.get_online_user_ids([self.user.id]), [self.user.id])
@@ -4,13 +4,15 @@ from .views import (
     DietitianProfileListCreateView, DietitianProfileRetrieveUpdateDestroyView,
     ClientProfileListCreateView, ClientProfileRetrieveUpdateDestroyView,
     SpecializationListCreateView, SpecializationRetrieveUpdateDestroyView,
-    HealthMetricListCreateView, HealthMetricRetrieveUpdateDestroyView
+    HealthMetricListCreateView, HealthMetricRetrieveUpdateDestroyView,
+    OnlineUsersView
 )
 
 urlpatterns = [
     path('users/', UserListCreateView.as_view(), name='user-list-create'),
     path('users/<int:pk>/', UserRetrieveUpdateDestroyView.as_view(), name='user-retrieve-update-destroy'),
     path('users/me/', me, name='user-me'),
+    path('users/online/', OnlineUsersView.as_view(), name='online-users'),
 
     path('dietitians/', DietitianProfileListCreateView.as_view(), name='dietitian-list-create'),
     path('dietitians/<int:pk>/', DietitianProfileRetrieveUpdateDestroyView.as_view(), name='dietitian-retrieve-update-destroy'),
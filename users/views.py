@@ -6,12 +6,12 @@ from .models import DietitianProfile, ClientProfile, Specialization, HealthMetri
 from .serializers import (
     UserSerializer, DietitianProfileSerializer,
     ClientProfileSerializer, SpecializationSerializer,
-    HealthMetricSerializer
+    HealthMetricSerializer, OnlineUsersQuerySerializer
 )
 from .services import (
     UserService, DietitianProfileService,
     ClientProfileService, SpecializationService,
-    HealthMetricService
+    HealthMetricService, PresenceService
 )
 from core.permissions import IsAdminOrReadOnly, IsOwnerOrAdmin, IsProfileOwnerOrAdmin
 
@@ -161,3 +161,13 @@ class HealthMetricRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIVie
             serializer.instance,
             **serializer.validated_data
         )
+
+class OnlineUsersView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = OnlineUsersQuerySerializer
+
+    def get(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data={'ids': request.query_params.getlist('ids')})
+        serializer.is_valid(raise_exception=True)
+        online_ids = PresenceService.get_online_user_ids(serializer.validated_data['ids'])
+        return Response({'online': online_ids})